@@ -0,0 +1,135 @@
+import asyncio
+import json
+from collections import deque
+from typing import Deque, Dict, Optional
+from urllib.parse import parse_qs
+
+from app.config import settings
+
+# admission control per route class, so a pile of heavy reads can't starve writes, logins and /health.
+# limits are per worker; anything over the concurrency limit waits in a bounded queue, and is shed
+# with a fast 503 + Retry-After when the queue is full or the wait runs past the timeout.
+
+# never limited: health checks, metrics, static files, cors preflight and the long lived event stream
+EXEMPT_PATHS = ("/health", "/static", "/docs", "/redoc", "/openapi.json", "/api/events/stream")
+
+LARGE_LIMIT = 250  # listings asking for more rows than this are treated like exports
+
+
+class RouteClassLimiter:
+    def __init__(self, name: str, concurrency: int, queue_size: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.active = 0
+        self.admitted = 0
+        self.shed = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self, timeout: float) -> bool:
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.queue_size:
+            self.shed += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # release() hands its slot straight to the oldest waiter
+            await asyncio.wait_for(waiter, timeout=timeout)
+        except asyncio.TimeoutError:
+            self.shed += 1
+            return False
+        except asyncio.CancelledError:
+            # client went away after the slot was handed over, pass it on
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        self.admitted += 1
+        return True
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "shed": self.shed,
+        }
+
+
+limiters: Dict[str, RouteClassLimiter] = {
+    name: RouteClassLimiter(name, concurrency, queue_size)
+    for name, (concurrency, queue_size) in settings.ADMISSION_LIMITS.items()
+}
+
+
+def classify(scope) -> Optional[str]:
+    method = scope["method"]
+    path = scope["path"]
+    if method == "OPTIONS" or path == "/" or path.startswith(EXEMPT_PATHS):
+        return None
+    if path.startswith("/auth"):
+        return "auth"
+    if "/export" in path:
+        return "export"
+    if method in ("GET", "HEAD") or path.endswith("/batch-get"):
+        limit = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("limit")
+        if limit and limit[0].isdigit() and int(limit[0]) > LARGE_LIMIT:
+            return "export"
+        return "read"
+    return "write"
+
+
+def admission_stats() -> Dict[str, Dict[str, int]]:
+    return {name: limiter.stats() for name, limiter in limiters.items()}
+
+
+class AdmissionControlMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        route_class = classify(scope)
+        limiter = limiters.get(route_class) if route_class else None
+        if limiter is None:
+            return await self.app(scope, receive, send)
+
+        if not await limiter.acquire(settings.ADMISSION_QUEUE_TIMEOUT_SECONDS):
+            return await self._shed(send, route_class)
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+    async def _shed(self, send, route_class: str):
+        body = json.dumps({"detail": f"Server busy ({route_class} requests), retry shortly"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(settings.ADMISSION_RETRY_AFTER_SECONDS).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -1,15 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from typing import List
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.crud.action_crud import (
     perform_record_action, 
     get_record_action_history,
     perform_dl_record_action,
-    get_dl_record_action_history
+    get_dl_record_action_history,
+    to_action_log_out
 )
 from app.schemas.action_schema import ActionRequest, ActionResponse, ActionLogOut
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models import user_models
 from app.security import get_current_user
 from app.crud.vehicle_registration_crud import bulk_active, bulk_approve, bulk_inactive, bulk_reject, bulk_set_on_hold, mark_active, mark_inactive
@@ -39,7 +40,7 @@ def perform_action(
             record_id=action_data.record_id,
             new_status=result["new_status"],
             action_logged=True,
-            time_stamp=result["log_entry"].timestamp
+            time_stamp=result["timestamp"]
         )
     except ValueError as e:
         # handle business logic errors (invalid action, record not found, etc.)
@@ -51,23 +52,11 @@ def perform_action(
 #history for a specific record
 @router.get("/{record_id}/history", response_model=List[ActionLogOut])
 def get_action_history(record_id: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: user_models.User = Depends(get_current_user)):
     try:
         history = get_record_action_history(db, record_id)
-        return [
-            ActionLogOut(
-                id=log.id,
-                record_table=log.record_type,
-                record_id=log.record_id,
-                action_type_name=log.action_type.name, # Join with ActionType
-                user_id=log.user_id,
-                notes=log.notes,
-                created_at=log.timestamp,
-                ip_address=log.ip_address
-            )
-            for log in history
-        ]
+        return [to_action_log_out(log) for log in history]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve action history: ${e}")
 
@@ -166,7 +155,7 @@ def approve_dl_record(
                 "record_id": record_id,
                 "old_status": result["old_status"],
                 "new_status": result["new_status"],
-                "timestamp": result["log_entry"].timestamp
+                "timestamp": result["timestamp"]
             }
         )
     except ValueError as e:
@@ -200,7 +189,7 @@ def reject_dl_record(
                 "record_id": record_id,
                 "old_status": result["old_status"],
                 "new_status": result["new_status"],
-                "timestamp": result["log_entry"].timestamp
+                "timestamp": result["timestamp"]
             }
         )
     except ValueError as e:
@@ -234,7 +223,7 @@ def hold_dl_record(
                 "record_id": record_id,
                 "old_status": result["old_status"],
                 "new_status": result["new_status"],
-                "timestamp": result["log_entry"].timestamp
+                "timestamp": result["timestamp"]
             }
         )
     except ValueError as e:
@@ -246,24 +235,12 @@ def hold_dl_record(
 @router.get("/dl/{record_id}/history", response_model=List[ActionLogOut])
 def get_dl_action_history(
     record_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: user_models.User = Depends(get_current_user)
 ):
     try:
         history = get_dl_record_action_history(db, record_id)
-        return [
-            ActionLogOut(
-                id=log.id,
-                record_table=log.record_type,
-                record_id=log.record_id,
-                action_type_name=log.action_type.name,
-                user_id=log.user_id,
-                notes=log.notes,
-                created_at=log.timestamp,
-                ip_address=log.ip_address
-            )
-            for log in history
-        ]
+        return [to_action_log_out(log) for log in history]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve DL action history: {str(e)}")
 
@@ -1,10 +1,15 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import user_models
 from app.schemas import rbac_schema
 from app.security import get_current_admin_user
+from app.cache_bus import invalidate
+from app.reference_data import get_reference_data
+from app.crud import user_crud
+from app.config import settings
+from app.schemas.base_schema import ApiResponse, CursorPaginatedResponse
 
 router = APIRouter(
     prefix="/admin",
@@ -16,8 +21,12 @@ router = APIRouter(
 
 @router.get("/roles", response_model=List[rbac_schema.Role])
 def get_roles(db: Session = Depends(get_db)):
-    roles = db.query(user_models.Role).all()
-    return roles
+    ref = get_reference_data(db)
+    return [
+        {"id": role.id, "name": role.name,
+         "permissions": [ref.permissions_by_id[p] for p in sorted(role.permission_ids) if p in ref.permissions_by_id]}
+        for role in sorted(ref.roles_by_id.values(), key=lambda r: r.id)
+    ]
 
 @router.post("/roles", response_model=rbac_schema.Role)
 def create_role(role_in: rbac_schema.RoleCreate, db: Session = Depends(get_db)):
@@ -36,6 +45,8 @@ def create_role(role_in: rbac_schema.RoleCreate, db: Session = Depends(get_db)):
         new_role.permissions = permissions
         
     db.add(new_role)
+    db.flush()
+    invalidate(db, "roles", [new_role.id])
     db.commit()
     db.refresh(new_role)
     return new_role
@@ -52,7 +63,8 @@ def update_role(role_id: int, role_in: rbac_schema.RoleUpdate, db: Session = Dep
     if role_in.permissions is not None:
         permissions = db.query(user_models.Permission).filter(user_models.Permission.id.in_(role_in.permissions)).all()
         role.permissions = permissions
-        
+
+    invalidate(db, "roles", [role.id])
     db.commit()
     db.refresh(role)
     return role
@@ -61,8 +73,8 @@ def update_role(role_id: int, role_in: rbac_schema.RoleUpdate, db: Session = Dep
 
 @router.get("/permissions", response_model=List[rbac_schema.Permission])
 def get_permissions(db: Session = Depends(get_db)):
-    permissions = db.query(user_models.Permission).all()
-    return permissions
+    ref = get_reference_data(db)
+    return [ref.permissions_by_id[p] for p in sorted(ref.permissions_by_id)]
 
 @router.post("/permissions", response_model=rbac_schema.Permission)
 def create_permission(perm_in: rbac_schema.PermissionCreate, db: Session = Depends(get_db)):
@@ -74,12 +86,62 @@ def create_permission(perm_in: rbac_schema.PermissionCreate, db: Session = Depen
         permission_name=perm_in.permission_name
     )
     db.add(new_perm)
+    db.flush()
+    invalidate(db, "permissions", [new_perm.id])
     db.commit()
     db.refresh(new_perm)
     return new_perm
 
+# --- Users ---
+
+@router.get("/users", response_model=CursorPaginatedResponse[List[rbac_schema.AdminUser]])
+def list_users(
+    q: Optional[str] = Query(None, min_length=1, max_length=100, description="Start of an email, first or last name"),
+    role_id: Optional[int] = Query(None),
+    is_active: Optional[bool] = Query(None),
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_db)
+):
+    rows, next_cursor = user_crud.get_users_page(
+        db, limit=limit, cursor=cursor, q=q, role_id=role_id, is_active=is_active
+    )
+    ref = get_reference_data(db)
+    users = [
+        rbac_schema.AdminUser(
+            id=user.id, email=user.email, first_name=user.first_name, middle_name=user.middle_name,
+            last_name=user.last_name, is_active=bool(user.is_active), created_at=user.created_at,
+            roles=[{"id": rid, "name": ref.roles_by_id[rid].name} for rid in role_ids if rid in ref.roles_by_id]
+        )
+        for user, role_ids in rows
+    ]
+    return CursorPaginatedResponse[List[rbac_schema.AdminUser]](data=users, next_cursor=next_cursor)
+
 # --- User Roles ---
 
+@router.post("/users/roles/bulk", response_model=ApiResponse[rbac_schema.BulkRoleAssignmentResult])
+def assign_roles_bulk(
+    bulk: rbac_schema.BulkRoleAssignment,
+    db: Session = Depends(get_db)
+):
+    assignments = {}
+    for item in bulk.assignments:
+        if item.email in assignments:
+            raise HTTPException(status_code=400, detail=f"Duplicate email: {item.email}")
+        assignments[item.email] = item.role_ids
+
+    # role ids are checked against the cached roles, no query
+    ref = get_reference_data(db)
+    missing_ids = {rid for role_ids in assignments.values() for rid in role_ids} - set(ref.roles_by_id)
+    if missing_ids:
+        raise HTTPException(status_code=400, detail=f"Roles not found: {missing_ids}")
+
+    users_updated, emails_pre_assigned = user_crud.assign_roles_bulk(db, assignments)
+    db.commit()
+    return ApiResponse(
+        message="Permission granted",
+        data=rbac_schema.BulkRoleAssignmentResult(users_updated=users_updated, emails_pre_assigned=emails_pre_assigned)
+    )
 
 
 @router.post("/users/roles/by-email")
@@ -102,6 +164,7 @@ def assign_roles_to_user_by_email(
     if user:
         # User exists, assign roles directly (replace existing)
         user.roles = roles
+        invalidate(db, "user_roles", [user.id])
         db.commit()
         return {"message": "Permission granted", "user_email": user.email, "role_ids": [r.id for r in user.roles]}
     else:
@@ -119,6 +182,7 @@ def assign_roles_to_user_by_email(
             )
             db.add(mapping)
             new_mappings.append(mapping)
-            
+
+        invalidate(db, "email_role_mappings")
         db.commit()
         return {"message": "Permission granted", "user_email": assignment.email, "role_ids": [r.role_id for r in new_mappings]}
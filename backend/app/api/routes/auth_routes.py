@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import hashlib
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import timedelta
@@ -12,8 +14,8 @@ from app.security import (
 )
 # from app.utils.hash_password import verify_password, hash_password
 from datetime import datetime, timedelta
-from app.models import user_models
 from app.schemas import user_schema
+from app.reference_data import get_permission_matrix, get_reference_data, get_user_role_ids
 
 router = APIRouter(tags=["Authentication"])
 
@@ -55,6 +57,8 @@ def register_new_user(
 
 @router.get("/getUserRoleandPermission_byemail", response_model=user_schema.UserWithPermissions)
 def get_current_user_profile(
+    request: Request,
+    response: Response,
     email: str | None = None,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -63,23 +67,24 @@ def get_current_user_profile(
     Fetches the currently logged-in user's profile, 
     including a flattened list of all their permissions.
     Optionally accepts an email to fetch a specific user's profile (Admin use case).
+    Roles and the module -> permissions grouping come from the cached permission matrix,
+    the response carries an ETag so the FE can revalidate it on every navigation.
     """
     target_user = current_user
+    role_ids = None
     if email:
         # TODO: Add check if current_user is Admin before allowing this
         user_by_email = user_crud.get_user_by_email(db, email=email)
         if user_by_email:
             target_user = user_by_email
         else:
-            # Check for pre-assigned roles in EmailRoleMapping
-            mappings = db.query(user_models.EmailRoleMapping).filter(
-                user_models.EmailRoleMapping.email_pattern == email
-            ).all()
+            # Check for pre-assigned roles in EmailRoleMapping (cached index, no query)
+            role_ids = get_reference_data(db).email_roles.exact(email)
             
-            if mappings:
+            if role_ids:
                 # Create a "virtual" user object for the schema response
                 class VirtualUser:
-                    def __init__(self, email, roles):
+                    def __init__(self, email):
                         self.id = 0
                         self.email = email
                         self.first_name = "Pre-assigned"
@@ -87,35 +92,39 @@ def get_current_user_profile(
                         self.last_name = None
                         self.is_active = True
                         self.created_at = datetime.now()
-                        self.roles = roles
 
-                virtual_roles = [m.role for m in mappings]
-                target_user = VirtualUser(email=email, roles=virtual_roles)
+                target_user = VirtualUser(email=email)
             else:
                  raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"User with email {email} not found"
                 )
 
-    # Group permissions by module
-    permissions_by_module = {}
-    
-    for role in target_user.roles:
-        for perm in role.permissions:
-            module_name = perm.module.name if perm.module else "Other"
-            if module_name not in permissions_by_module:
-                permissions_by_module[module_name] = set()
-            permissions_by_module[module_name].add(perm.permission_name)
-            
-    # Convert to list of ModulePermissions
-    module_permissions_list = []
-    for module, slugs in permissions_by_module.items():
-        module_permissions_list.append(
-            user_schema.ModulePermissions(module=module, permissions=list(slugs))
-        )
+    if role_ids is None:
+        role_ids = get_user_role_ids(db, target_user)
+    matrix = get_permission_matrix(role_ids, db)
 
-    # Create response object
-    user_response = user_schema.UserWithPermissions.model_validate(target_user)
-    user_response.permissions = module_permissions_list
-    
-    return user_response
+    etag_source = (
+        matrix.version, target_user.id, target_user.email, target_user.first_name, target_user.middle_name,
+        target_user.last_name, target_user.is_active, None if target_user.id == 0 else target_user.created_at
+    )
+    etag = f'W/"profile-{hashlib.sha1(repr(etag_source).encode()).hexdigest()[:16]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+
+    return user_schema.UserWithPermissions(
+        id=target_user.id,
+        email=target_user.email,
+        first_name=target_user.first_name,
+        middle_name=target_user.middle_name,
+        last_name=target_user.last_name,
+        is_active=target_user.is_active,
+        created_at=target_user.created_at,
+        roles=[user_schema.Role(id=role.id, name=role.name) for role in matrix.roles],
+        permissions=[
+            user_schema.ModulePermissions(module=module, permissions=list(names))
+            for module, names in matrix.modules
+        ],
+    )
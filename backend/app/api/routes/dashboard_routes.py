@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from app.database import get_db
+from app.database import get_read_db
 from app.models import vehicle_registration, user_models
 from app.security import get_current_user
 
@@ -10,7 +10,7 @@ router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 #provides a summary of record statuses
 @router.get("/summary")
 def get_dashboard_summary(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: user_models.User = Depends(get_current_user)
 ):
     try:
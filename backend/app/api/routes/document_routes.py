@@ -1,36 +1,100 @@
-from typing import List, Optional
-from fastapi import APIRouter, Body, Query, UploadFile, File, Form, Depends, HTTPException, Path
-from sqlalchemy import func
-from sqlalchemy.orm import Session
-import shutil
+import logging
 import os
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Body, Query, Request, Response, UploadFile, File, Form, Depends, HTTPException, Path, status as http_status
+from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, load_only
 from uuid import uuid4
-from app.database import get_db
-from app.models.document_library import DocumentLibrary, DocumentAuditLog
-from app.schemas.document_schema import DocumentLibrarySchema, DocumentResponse, DocumentUpdateRequest, DocumentUploadResponse
+from app.database import get_db, get_read_db
+from app.models.document_library import DocumentLibrary, DocumentAuditLog, DocumentRecordLink
+from app.schemas.document_schema import (
+    AutoLinkRunResponse, DocumentBatchUploadItem, DocumentLibrarySchema, DocumentLinkReviewRequest, DocumentListItem,
+    DocumentRecordLinkOut, DocumentResponse, DocumentSearchHit, DocumentUpdateRequest, DocumentUploadResponse
+)
 from datetime import datetime
 from app.schemas import document_schema
-from app.security import get_current_user
+from app.security import get_current_admin_user, get_current_user
 from app.models.user_models import User
-from app.schemas.base_schema import ApiResponse
+from app.schemas.base_schema import ApiResponse, CursorPaginatedResponse
+from app.utils.fieldsets import allowed_fields, parse_fields, project, sparse_response
+from app.crud.document_crud import find_documents_by_ocr, get_documents_page
+from app.crud.document_link_crud import get_document_links, run_auto_link
+from app.crud.document_search_crud import refresh_document_search, search_documents
+from app.config import settings
+from app.events import publish_change
+from app.audit import record_audit
+from app.utils.batch_upload import collect_entries, remove_written, write_entries
+from app.storage import HashingReader, content_disposition, get_storage, iter_chunks, open_document, resolve
+from app.previews import MEDIA_TYPES, preview_path, schedule_preview
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/documents", tags=["Document Library"])
-UPLOAD_DIR = "app/static/uploads"
 
-@router.get("/", response_model=ApiResponse[List[DocumentResponse]])
+@router.get("/", response_model=CursorPaginatedResponse[List[DocumentListItem]])
 def get_all_documents(
     document_type: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    master_record_id: Optional[int] = Query(None),
+    status: Optional[str] = Query(None),
+    uploaded_by: Optional[int] = Query(None, description="User id of the uploader"),
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma separated columns to return, e.g. id,document_name,status"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    field_list = parse_fields(fields, allowed_fields(DocumentListItem, DocumentLibrary))
+    docs, next_cursor = get_documents_page(
+        db, limit=limit, cursor=cursor, document_type=document_type,
+        master_record_id=master_record_id, status=status, uploaded_by=uploaded_by,
+        fields=field_list
+    )
+    if field_list:
+        return sparse_response(CursorPaginatedResponse(
+            data=[project(doc, field_list) for doc in docs], next_cursor=next_cursor
+        ))
+    return CursorPaginatedResponse[List[DocumentListItem]](data=docs, next_cursor=next_cursor)
+
+@router.get("/search", response_model=ApiResponse[List[DocumentSearchHit]])
+def full_text_search_documents(
+    q: str = Query(..., min_length=2, description="Words to look for in document names, OCR text and notes"),
+    document_type: Optional[str] = Query(None),
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    hits = search_documents(db, q, limit=limit, offset=offset, document_type=document_type)
+    return ApiResponse[List[DocumentSearchHit]](data=[
+        DocumentSearchHit(
+            **DocumentListItem.model_validate(doc).model_dump(), rank=rank, highlight=highlight
+        )
+        for doc, rank, highlight in hits
+    ])
+
+@router.get("/ocr-search", response_model=ApiResponse[List[DocumentListItem]])
+def search_documents_by_ocr(
+    plate: Optional[str] = Query(None, description="Plate read by OCR (case-insensitive)"),
+    vin: Optional[str] = Query(None, description="VIN read by OCR (case-insensitive)"),
+    owner: Optional[str] = Query(None, description="Owner name read by OCR (exact)"),
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    query = db.query(DocumentLibrary)
-    if document_type:
-        query = query.filter(DocumentLibrary.document_type == document_type)
-    docs = query.filter(DocumentLibrary.is_archived == False).order_by(DocumentLibrary.created_at.desc()).all()
-    return ApiResponse[List[DocumentResponse]](data=docs)
+    if not (plate or vin or owner):
+        raise HTTPException(status_code=400, detail="Give at least one of plate, vin or owner")
+    docs = find_documents_by_ocr(
+        db, plate=plate, vin=vin,
+        other_fields={"owner": owner} if owner else None,
+        limit=limit
+    )
+    return ApiResponse[List[DocumentListItem]](data=docs)
 
 @router.post("/upload", response_model=DocumentUploadResponse)
-async def upload_document(
+def upload_document(
     file: UploadFile = File(...),
     document_type: str = Form(...),
     master_record_id: Optional[int] = Form(None),
@@ -38,51 +102,133 @@ async def upload_document(
     current_user: User = Depends(get_current_user)
 ):
     try:
-        os.makedirs(UPLOAD_DIR, exist_ok=True)
+        storage = get_storage()
         filename = f"{uuid4().hex}_{file.filename}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        document_url = f"/static/uploads/{filename}"
+        reader = HashingReader(file.file)
+        size = storage.save(filename, reader)
+        document_url = storage.url_for(filename)
 
         doc = DocumentLibrary(
             document_name=file.filename,
             document_type=document_type,
-            document_size=round(os.path.getsize(file_path) / 1024, 2),
+            document_size=round(size / 1024, 2),
             document_url=document_url,
+            content_hash=reader.hexdigest(),
             master_record_id=master_record_id if master_record_id else None,
             created_by=current_user.id,
             created_at=func.now()
         )
         db.add(doc)
-        db.commit()
-        db.refresh(doc)
+        db.flush()
 
-        log = DocumentAuditLog(
+        # audit row goes out with the document, one commit
+        record_audit(
+            db, DocumentAuditLog,
             document_id=doc.id,
             action="upload",
             performed_by=current_user.id,
-            timestamp=func.now(),
+            timestamp=datetime.utcnow(),
             notes="manual upload"
         )
-        db.add(log)
+        refresh_document_search(db, [doc.id])
         db.commit()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+    # the document is saved from here on, nothing below may turn into an error the client retries
+    publish_change("document", "uploaded", [doc.id])
+    schedule_preview(doc.document_url, None, doc.content_hash)
 
-        return DocumentUploadResponse(
-            id=doc.id,
-            document_name=doc.document_name,
-            document_type=doc.document_type,
-            document_url=doc.document_url,
-            status=doc.status,
-            created_by=doc.created_by
+    return DocumentUploadResponse(
+        id=doc.id,
+        document_name=doc.document_name,
+        document_type=doc.document_type,
+        document_url=doc.document_url,
+        status=doc.status,
+        created_by=doc.created_by
+    )
+
+@router.post("/upload/batch", response_model=ApiResponse[List[DocumentBatchUploadItem]])
+def upload_documents_batch(
+    files: List[UploadFile] = File(...),
+    document_type: str = Form(...),
+    master_record_id: Optional[int] = Form(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    # several files, or a single zip that is extracted member by member
+    entries = collect_entries(files)
+    if not entries:
+        raise HTTPException(status_code=400, detail="No files to upload")
+
+    storage = get_storage()
+    write_entries(entries, storage)
+    written = [entry for entry in entries if entry.stored_name]
+
+    # documents go in with one multi-row insert, audit rows with the single commit.
+    # created_at is the db's now() like single uploads (naive column, the server clock decides), read once
+    # so the whole batch shares it; audit timestamps stay utc as everywhere else
+    created_at = db.scalar(select(func.now()))
+    now = datetime.utcnow()
+    docs = [
+        DocumentLibrary(
+            document_name=entry.filename,
+            document_type=document_type,
+            document_size=entry.size_kb,
+            document_url=storage.url_for(entry.stored_name),
+            content_hash=entry.content_hash,
+            master_record_id=master_record_id if master_record_id else None,
+            created_by=current_user.id,
+            created_at=created_at
         )
+        for entry in written
+    ]
+    try:
+        if docs:
+            db.add_all(docs)
+            db.flush()
+            for doc in docs:
+                record_audit(
+                    db, DocumentAuditLog,
+                    document_id=doc.id,
+                    action="upload",
+                    performed_by=current_user.id,
+                    timestamp=now,
+                    notes="batch upload"
+                )
+            refresh_document_search(db, [doc.id for doc in docs])
+            db.commit()
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+        db.rollback()
+        remove_written(written, storage)
+        raise HTTPException(status_code=500, detail=f"Batch upload failed: {str(e)}")
+
+    if docs:
+        publish_change("document", "uploaded", [doc.id for doc in docs])
+        for doc in docs:
+            schedule_preview(doc.document_url, None, doc.content_hash)
+
+    doc_by_name = {entry.stored_name: doc for entry, doc in zip(written, docs)}
+    results = []
+    for entry in entries:
+        doc = doc_by_name.get(entry.stored_name) if entry.stored_name else None
+        results.append(DocumentBatchUploadItem(
+            filename=entry.filename,
+            status="uploaded" if doc else "failed",
+            document_id=doc.id if doc else None,
+            document_url=doc.document_url if doc else None,
+            error=entry.error
+        ))
+
+    return ApiResponse[List[DocumentBatchUploadItem]](
+        message=f"Uploaded {len(docs)} of {len(entries)} files",
+        data=results
+    )
 
 @router.get("/{document_id}", response_model=DocumentResponse)
 def get_document(
     document_id: int = Path(...),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     doc = db.query(DocumentLibrary).filter_by(id=document_id).first()
@@ -90,6 +236,83 @@ def get_document(
         raise HTTPException(status_code=404, detail="Document not found")
     return doc
 
+@router.get("/{document_id}/download")
+def download_document(
+    document_id: int = Path(...),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    doc = db.query(DocumentLibrary).options(load_only(
+        DocumentLibrary.id, DocumentLibrary.document_name, DocumentLibrary.document_url, DocumentLibrary.document_size,
+        DocumentLibrary.compression
+    )).filter_by(id=document_id).first()
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    try:
+        storage, key = resolve(doc.document_url)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Document file not found")
+
+    # large files go straight from the bucket, the api only signs the url.
+    # not for compressed (cold) files, those are decompressed here while streaming
+    if not doc.compression and (doc.document_size or 0) * 1024 >= settings.PRESIGN_MIN_BYTES:
+        presigned = storage.presigned_url(key, doc.document_name)
+        if presigned:
+            return RedirectResponse(presigned, status_code=307)
+
+    try:
+        source = open_document(doc.document_url, doc.compression)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Document file not found")
+    return StreamingResponse(
+        iter_chunks(source),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": content_disposition(doc.document_name)}
+    )
+
+@router.get("/{document_id}/preview")
+def get_document_preview(
+    request: Request,
+    document_id: int = Path(...),
+    size: Literal["thumb", "page"] = Query("thumb", description="thumb (first page) or page (low-res page image)"),
+    page: int = Query(1, ge=1, le=settings.PREVIEW_MAX_PAGES),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    doc = db.query(DocumentLibrary).options(load_only(
+        DocumentLibrary.id, DocumentLibrary.document_url, DocumentLibrary.compression, DocumentLibrary.content_hash
+    )).filter_by(id=document_id).first()
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if not doc.content_hash:
+        raise HTTPException(status_code=404, detail="Preview not available for this document")
+
+    # a render never changes for the same content, let the browser keep it
+    etag = f'"{doc.content_hash}-{size}-{page}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=http_status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    path = preview_path(doc.content_hash, size, 1 if size == "thumb" else page)
+    if not os.path.exists(path):
+        future = schedule_preview(doc.document_url, doc.compression, doc.content_hash)
+        try:
+            if future is not None:
+                future.result(timeout=settings.PREVIEW_RENDER_TIMEOUT_SECONDS)
+        except FutureTimeoutError:
+            raise HTTPException(status_code=503, detail="Preview is still rendering", headers={"Retry-After": "2"})
+        except BrokenProcessPool:
+            # the render worker died, the pool is rebuilt for the next try
+            raise HTTPException(status_code=503, detail="Preview renderer unavailable", headers={"Retry-After": "5"})
+        except Exception as e:
+            # the file can't be previewed (unsupported format, unreadable), that is a plain 404
+            logger.info("preview for document %s failed: %s", document_id, e)
+        if future is None and settings.PREVIEWS_ENABLED and not os.path.exists(path):
+            raise HTTPException(status_code=503, detail="Preview renderer unavailable", headers={"Retry-After": "5"})
+        if not os.path.exists(path):
+            raise HTTPException(status_code=404, detail="Preview not available for this document")
+
+    return FileResponse(path, media_type=MEDIA_TYPES[settings.PREVIEW_FORMAT], headers=headers)
 
 @router.post("/ocr/{document_id}")
 def simulate_ocr_processing(
@@ -112,18 +335,16 @@ def simulate_ocr_processing(
     }
     doc.ocr_response_json = simulated_ocr
     doc.status = "completed"
-    db.add(doc)
-    db.commit()
-    db.refresh(doc)
-
-    log = DocumentAuditLog(
+    doc.links_proposed_at = None  # new OCR result, let the auto-link pipeline look at it again
+    record_audit(
+        db, DocumentAuditLog,
         document_id=doc.id,
         action="ocr_simulated",
         performed_by=current_user.id,
-        timestamp=func.now(),
+        timestamp=datetime.utcnow(),
         notes="OCR simulated response attached"
     )
-    db.add(log)
+    refresh_document_search(db, [doc.id])
     db.commit()
 
     return {
@@ -131,6 +352,67 @@ def simulate_ocr_processing(
         "ocr_data": simulated_ocr
     }
 
+@router.post("/auto-link", response_model=ApiResponse[AutoLinkRunResponse])
+def auto_link_documents(
+    batch_size: int = Query(settings.AUTO_LINK_BATCH_SIZE, ge=1, le=5000),
+    max_batches: int = Query(
+        settings.AUTO_LINK_MAX_BATCHES_PER_REQUEST, ge=1, le=settings.AUTO_LINK_MAX_BATCHES_PER_REQUEST,
+        description="Stop after this many batches"
+    ),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    # propose record links for OCR-completed documents that haven't been looked at yet (admins only,
+    # bounded so a request never drains the whole backlog inside the api)
+    totals = run_auto_link(db, batch_size=batch_size, max_batches=max_batches)
+    return ApiResponse[AutoLinkRunResponse](
+        message=f"Proposed {totals['links_proposed']} links for {totals['documents_processed']} documents",
+        data=AutoLinkRunResponse(**totals)
+    )
+
+@router.get("/{document_id}/links", response_model=ApiResponse[List[DocumentRecordLinkOut]])
+def get_links_for_document(
+    document_id: int = Path(...),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    return ApiResponse[List[DocumentRecordLinkOut]](data=get_document_links(db, document_id))
+
+@router.put("/links/{link_id}", response_model=ApiResponse[DocumentRecordLinkOut])
+def review_document_link(
+    link_id: int = Path(...),
+    payload: DocumentLinkReviewRequest = Body(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    link = db.query(DocumentRecordLink).filter(DocumentRecordLink.id == link_id).first()
+    if not link:
+        raise HTTPException(status_code=404, detail="Link not found")
+    if link.status != "proposed":
+        raise HTTPException(status_code=409, detail=f"Link was already {link.status}")
+
+    link.status = payload.status
+    link.reviewed_by = current_user.id
+    link.reviewed_at = datetime.utcnow()
+    # an accepted vr link becomes the document's master record
+    if payload.status == "accepted" and link.record_type == "vr":
+        db.query(DocumentLibrary).filter(DocumentLibrary.id == link.document_id).update(
+            {DocumentLibrary.master_record_id: link.record_id, DocumentLibrary.modified_by: current_user.id},
+            synchronize_session=False
+        )
+    record_audit(
+        db, DocumentAuditLog,
+        document_id=link.document_id,
+        action=f"link_{payload.status}",
+        performed_by=current_user.id,
+        timestamp=link.reviewed_at,
+        notes=f"{link.record_type} record {link.record_id} (confidence {link.confidence})"
+    )
+    db.commit()
+    publish_change("document", "updated", [link.document_id])
+
+    return ApiResponse[DocumentRecordLinkOut](message=f"Link {payload.status}", data=link)
+
 @router.put("/{document_id}", response_model=DocumentUploadResponse)
 def update_document(
     document_id: int = Path(...),
@@ -146,17 +428,15 @@ def update_document(
         setattr(doc, key, value)
     doc.modified_by = current_user.id
     doc.modified_at = func.now()
-    db.commit()
-    db.refresh(doc)
-
-    log = DocumentAuditLog(
+    record_audit(
+        db, DocumentAuditLog,
         document_id=doc.id,
         action="update",
         performed_by=current_user.id,
-        timestamp=func.now(),
+        timestamp=datetime.utcnow(),
         notes="Document metadata updated"
     )
-    db.add(log)
+    refresh_document_search(db, [doc.id])
     db.commit()
 
     return DocumentUploadResponse(
@@ -181,16 +461,14 @@ def archive_document(
     doc.is_archived = True
     doc.modified_by = current_user.id
     doc.modified_at = func.now()
-    db.commit()
-
-    log = DocumentAuditLog(
+    record_audit(
+        db, DocumentAuditLog,
         document_id=doc.id,
         action="archive",
         performed_by=current_user.id,
-        timestamp=func.now(),
+        timestamp=datetime.utcnow(),
         notes="Document archived (soft delete)"
     )
-    db.add(log)
     db.commit()
 
     return {"message": f"Document {document_id} archived successfully."}
@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.crud import driving_license_crud as crud
 from app.schemas.driving_license_schema import (
     DriverLicenseOriginalCreate,
@@ -18,7 +18,10 @@ from app.schemas.driving_license_schema import (
     RecordsCountResponse
 )
 
-from app.schemas.base_schema import ApiResponse
+from app.schemas.base_schema import ApiResponse, BatchGetItem, BatchGetRequest, PaginatedResponse
+from app.models.driving_license import DriverLicenseOriginalRecord
+from app.utils.fieldsets import allowed_fields, parse_fields, project, sparse_response
+from app.utils.pagination import TotalMode, set_total_headers
 
 router = APIRouter(prefix="/driver-license", tags=["Driver License"])
 
@@ -36,34 +39,79 @@ def create_original_record(
         raise HTTPException(status_code=400, detail=str(e))
 
 # get all records
-@router.get("/", response_model=ApiResponse[List[DriverLicenseOriginalResponse]])
+@router.get("/", response_model=PaginatedResponse[List[DriverLicenseOriginalResponse]])
 def get_all_records(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     status: Optional[str] = None,
     approval_status: Optional[str] = None,
     active_only: bool = True,
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(None, description="Comma separated columns to return, e.g. id,tdl,fdl"),
+    count: TotalMode = Query("none", description="Include a total: none, exact or estimated"),
+    db: Session = Depends(get_read_db)
 ):
-    records = crud.get_all_records(
+    field_list = parse_fields(fields, allowed_fields(DriverLicenseOriginalResponse, DriverLicenseOriginalRecord))
+    page = crud.get_all_records(
         db=db,
         skip=skip,
         limit=limit,
         # status=status,
         approval_status=approval_status,
-        active_only=active_only
+        active_only=active_only,
+        fields=field_list,
+        total_mode=count
+    )
+    set_total_headers(response, page)
+    result = PaginatedResponse(
+        status="success",
+        message=f"Retrieved {len(page.items)} driver license records",
+        data=[project(r, field_list) for r in page.items] if field_list else page.items,
+        total=page.total,
+        total_estimated=page.estimated
     )
+    if field_list:
+        sparse = sparse_response(result)
+        set_total_headers(sparse, page)
+        return sparse
+    return result
+
+# hydrate many records in one call, results follow the order of the requested ids
+@router.post("/batch-get", response_model=ApiResponse[List[BatchGetItem[DriverLicenseOriginalDetailResponse]]])
+def batch_get_records(
+    payload: BatchGetRequest,
+    db: Session = Depends(get_read_db)
+):
+    include = crud.parse_record_include(payload.include)
+    records = crud.get_records_by_ids(db, payload.ids, include)
+
+    items = []
+    for record_id, record in zip(payload.ids, records):
+        data = None
+        if record is not None:
+            data = DriverLicenseOriginalDetailResponse.model_validate(record)
+            if "contacts" not in include:
+                data.contacts = None
+            if "fictitious_traps" not in include:
+                data.fictitious_traps = None
+        items.append(BatchGetItem[DriverLicenseOriginalDetailResponse](
+            id=record_id,
+            found=record is not None,
+            data=data
+        ))
+
+    found = sum(1 for item in items if item.found)
     return ApiResponse(
         status="success",
-        message=f"Retrieved {len(records)} driver license records",
-        data=records
+        message=f"Found {found} of {len(items)} requested records",
+        data=items
     )
 
 # get detailed record
 @router.get("/{record_id}", response_model=DriverLicenseOriginalDetailResponse)
 def get_record_by_id(
     record_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     record = crud.get_record_by_id(db, record_id)
     return record
@@ -72,7 +120,7 @@ def get_record_by_id(
 @router.get("/tdl/{tdl}", response_model=DriverLicenseOriginalDetailResponse)
 def get_record_by_tdl(
     tdl: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     record = crud.get_record_by_tdl(db, tdl)
     return record
@@ -120,7 +168,7 @@ def hard_delete_record(
 def get_all_contacts(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     contacts = crud.get_all_contacts(db, skip=skip, limit=limit)
     return ApiResponse(
@@ -133,7 +181,7 @@ def get_all_contacts(
 @router.get("/contact/{contact_id}", response_model=ApiResponse[DriverLicenseContactResponse])
 def get_contact_by_id(
     contact_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     contact = crud.get_contact_by_id(db, contact_id)
     return ApiResponse(
@@ -156,7 +204,7 @@ def create_contact(
 @router.get("/{record_id}/contacts", response_model=List[DriverLicenseContactResponse])
 def get_contacts_by_record(
     record_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     contacts = crud.get_contacts_by_record(db, record_id)
     return contacts
@@ -186,7 +234,7 @@ def delete_contact(
 def get_all_traps(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     traps = crud.get_all_traps(db, skip=skip, limit=limit)
     return ApiResponse(
@@ -199,7 +247,7 @@ def get_all_traps(
 @router.get("/trap/{trap_id}", response_model=ApiResponse[DriverLicenseFictitiousTrapResponse])
 def get_trap_by_id(
     trap_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     trap = crud.get_trap_by_id(db, trap_id)
     return ApiResponse(
@@ -223,7 +271,7 @@ def create_fictitious_trap(
 @router.get("/{record_id}/traps", response_model=List[DriverLicenseFictitiousTrapResponse])
 def get_traps_by_record(
     record_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     traps = crud.get_traps_by_record(db, record_id)
     return traps
@@ -250,6 +298,6 @@ def delete_trap(
 
 # stats
 @router.get("/stats/count", response_model=RecordsCountResponse)
-def get_records_count(db: Session = Depends(get_db)):
+def get_records_count(db: Session = Depends(get_read_db)):
     stats = crud.get_records_count(db)
     return stats
@@ -0,0 +1,47 @@
+import asyncio
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.events import COALESCE_SECONDS, HEARTBEAT_SECONDS, broker
+from app.models import user_models
+from app.security import get_current_user
+
+router = APIRouter(prefix="/events", tags=["Live Updates"])
+
+# server-sent events with record changes, replaces polling the dashboard and listings.
+# each message is {"events": [{"topic", "action", "ids"}]}; ids null means refetch the whole view
+@router.get("/stream")
+async def stream_changes(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: user_models.User = Depends(get_current_user)
+):
+    roles = [role.name for role in current_user.roles]
+    # don't hold a pooled connection for the lifetime of the stream
+    db.close()
+
+    subscriber = broker.subscribe(roles)
+
+    async def event_stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    await asyncio.wait_for(subscriber.wakeup.wait(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                # let the rest of a burst (bulk actions, batch uploads) land in the same message
+                await asyncio.sleep(COALESCE_SECONDS)
+                yield broker.format(subscriber.drain())
+        finally:
+            broker.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Path, Query
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.schemas.record_suppression_schema import (
     SuppressRecordRequest,
     RevokeSuppressionRequest,
@@ -30,6 +30,8 @@ from app.crud.vehicle_registration_crud import get_vehicle_master_details
 from app.models.record_suppression import RecordSuppressionRequest
 from app.security import get_current_user
 from app.crud.action_crud import get_record_by_id
+from app.schemas.record_suppression_schema import ActiveSuppressionListResponse
+from app.utils.fieldsets import parse_fields, sparse_response
 
 router = APIRouter(
     prefix="/record-suppression",
@@ -109,7 +111,7 @@ async def revoke_suppression_endpoint(
 async def get_history_endpoint(
     record_type: str,
     record_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     try:
         history = get_suppression_history(db, record_type, record_id)
@@ -130,15 +132,20 @@ async def list_active_suppressions_endpoint(
     record_type: str = Query(None, description="Filter by record type (optional)"),
     limit: int = Query(50, ge=1, le=100, description="Number of results"),
     offset: int = Query(0, ge=0, description="Pagination offset"),
-    db: Session = Depends(get_db)
+    fields: str = Query(None, description="Comma separated fields to return, e.g. suppression_id,record_id"),
+    db: Session = Depends(get_read_db)
 ):
+    field_list = parse_fields(fields, ActiveSuppressionListResponse.model_fields, key="suppression_id")
     try:
         result = get_active_suppressions(
             db,
             record_type=record_type,
             limit=limit,
-            offset=offset
+            offset=offset,
+            fields=field_list
         )
+        if field_list:
+            return sparse_response(result)
         return result
     except Exception as e:
         raise HTTPException(
@@ -155,7 +162,7 @@ async def list_active_suppressions_endpoint(
 async def check_suppression_endpoint(
     record_type: str,
     record_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     try:
         suppression = get_suppression_for_record(db, record_type, record_id)
@@ -262,7 +269,7 @@ async def create_suppressed_dl_original_endpoint(
 @router.get("/{suppression_id}/detailed")
 def open_suppressed_record(
     suppression_id: int = Path(..., description="Suppression numeric id"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_user),
 ):
     # 1) load suppression row
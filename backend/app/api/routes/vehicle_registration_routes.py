@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List, Optional, Union
-from app.database import get_db
+from app.database import get_db, get_read_db
 
 from app.crud.vehicle_registration_crud import (
     create_contact,
@@ -24,6 +25,9 @@ from app.crud.vehicle_registration_crud import (
     get_all_trap_info_undercover,
     get_all_vehicles,
     get_contact,
+    get_masters_by_ids,
+    get_masters_snapshot_version,
+    get_vehicle_model,
     get_contacts_by_master,
     get_reciprocal_issued,
     get_reciprocal_issued_by_id,
@@ -35,6 +39,9 @@ from app.crud.vehicle_registration_crud import (
     get_trap_info_undercover,
     get_trap_info_undercover_by_uc,
     get_vehicle_master_details,
+    parse_master_include,
+    search_masters_typeahead,
+    DEFAULT_DETAILS_INCLUDE,
     update_reciprocal_issued,
     update_reciprocal_received,
     update_trap_info_fictitious,
@@ -47,16 +54,19 @@ from app.schemas.vehicle_registration_schema import(
     UnderCoverCreateRequest,
     VehicleRegistrationContact,
     VehicleRegistrationContactCreateBody,
+    VehicleRegistrationFictitiousListItem,
     VehicleRegistrationFictitiousResponse,
     VehicleRegistrationFictitiousTrapInfo,
     VehicleRegistrationFictitiousTrapInfoCreateBody,
     VehicleRegistrationMasterBase,
     VehicleRegistrationMasterDetails,
+    VehicleRegistrationMasterListItem,
     VehicleRegistrationMasterResponse,
     VehicleRegistrationReciprocalIssued,
     VehicleRegistrationReciprocalIssuedCreateBody,
     VehicleRegistrationReciprocalReceived,
     VehicleRegistrationReciprocalReceivedCreateBody,
+    VehicleRegistrationUnderCoverListItem,
     VehicleRegistrationUnderCoverResponse,
     MasterCreateRequest,
     VehicleRegistrationUnderCoverTrapInfo,
@@ -64,10 +74,15 @@ from app.schemas.vehicle_registration_schema import(
 )
 from app.security import get_current_user
 
-from app.schemas.base_schema import ApiResponse
+from app.schemas.base_schema import ApiResponse, BatchGetItem, BatchGetRequest, PaginatedResponse
 from app.models import user_models
 from app.crud.driving_license_crud import delete_contact, update_contact
+from app.crud.action_crud import get_action_history_for_records, to_action_log_out
+from app.schemas.document_schema import DocumentSummary
+from app.utils.fieldsets import allowed_fields, parse_fields, project, sparse_response
+from app.utils.pagination import TotalMode, set_total_headers
 from app.rbac import PermissionChecker, RoleChecker
+from app.config import settings
 
 router = APIRouter(prefix="/vehicle-registration", tags=["Vehicle Registration"])
     
@@ -113,6 +128,13 @@ def create_vehicle_record(
                 message=f"Fictitious record created successfully with ID {result.id}",
                 data=data
             )
+    except IntegrityError:
+        # a retried create without an Idempotency-Key lands here on the license_number unique index
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A record with this license number already exists"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -120,37 +142,55 @@ def create_vehicle_record(
         )
     
 # Read all
-@router.get("/", response_model=ApiResponse[List[Union[
-    VehicleRegistrationMasterResponse,
-    VehicleRegistrationUnderCoverResponse,
-    VehicleRegistrationFictitiousResponse
+@router.get("/", response_model=PaginatedResponse[List[Union[
+    VehicleRegistrationMasterListItem,
+    VehicleRegistrationUnderCoverListItem,
+    VehicleRegistrationFictitiousListItem
 ]]])
 def list_vehicles(
+    response: Response,
     skip: int = 0,
     limit: int = 25,
     search: Optional[str] = Query(None, description="Search by license number"),
     record_type: Optional[str] = Query(None, description="master, undercover, or fictitious"),
     approval_status: Optional[str] = Query(None, description="pending, approved, rejected, on_hold"),
-    db: Session = Depends(get_db),
+    fields: Optional[str] = Query(None, description="Comma separated columns to return, e.g. id,license_number,registered_owner"),
+    count: TotalMode = Query("none", description="Include a total: none, exact or estimated"),
+    db: Session = Depends(get_read_db),
     # current_user: user_models.User = Depends(get_current_user)
     current_user: user_models.User = Depends(RoleChecker("Admin","Supervisor / Manager")),
     permission_check = Depends(PermissionChecker("view_vr_records")),
     
 ):
+    # rows leave out the large-text columns, fields= can still ask for any column of the full record
+    if record_type == "undercover":
+        schema, item_schema = VehicleRegistrationUnderCoverResponse, VehicleRegistrationUnderCoverListItem
+    elif record_type == "fictitious":
+        schema, item_schema = VehicleRegistrationFictitiousResponse, VehicleRegistrationFictitiousListItem
+    else:
+        schema, item_schema = VehicleRegistrationMasterResponse, VehicleRegistrationMasterListItem
+
+    field_list = parse_fields(fields, allowed_fields(schema, get_vehicle_model(record_type)))
+
     try:
-        vehicle_list = get_all_vehicles(
+        page = get_all_vehicles(
             db, skip=skip, limit=limit, search=search,
-            record_type=record_type, approval_status=approval_status
+            record_type=record_type, approval_status=approval_status,
+            fields=field_list, total_mode=count
         )
+        set_total_headers(response, page)
 
-        if record_type == "undercover":
-            data = [VehicleRegistrationUnderCoverResponse.model_validate(v) for v in vehicle_list]
-        elif record_type == "fictitious":
-            data = [VehicleRegistrationFictitiousResponse.model_validate(v) for v in vehicle_list]
-        else:
-            data = [VehicleRegistrationMasterResponse.model_validate(v) for v in vehicle_list]
+        if field_list:
+            result = sparse_response(PaginatedResponse(
+                data=[project(v, field_list) for v in page.items],
+                total=page.total, total_estimated=page.estimated
+            ))
+            set_total_headers(result, page)
+            return result
+
+        data = [item_schema.model_validate(v) for v in page.items]
 
-        return ApiResponse(data=data)
+        return PaginatedResponse(data=data, total=page.total, total_estimated=page.estimated)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to retrieve records: {e}")
 
@@ -178,26 +218,112 @@ def update_vehicle(
 
 # Details endpoint
 @router.get("/{master_id}/details", response_model=ApiResponse[VehicleRegistrationMasterDetails])
-def get_master_record_details(master_id: str, db: Session = Depends(get_db), 
+def get_master_record_details(master_id: str, db: Session = Depends(get_read_db), 
                               #current_user: user_models.User = Depends(get_current_user)
                                 current_user: user_models.User = Depends(RoleChecker("Admin","Supervisor / Manager","User")),
                                 permission_check = Depends(PermissionChecker("view_vr_records")),
-                              
+                                include: Optional[str] = Query(
+                                    None,
+                                    description="Comma separated relations to load: contacts, undercover, undercover.trap_info, "
+                                                "fictitious, fictitious.trap_info, documents, history. Defaults to contacts and UC/FC with trap info"
+                                ),
                               ):
-    db_record = get_vehicle_master_details(db=db, master_id=master_id)
+    include_set = parse_master_include(include.split(",")) if include is not None else DEFAULT_DETAILS_INCLUDE
+    db_record = get_vehicle_master_details(db=db, master_id=master_id, include=include_set)
     if db_record is None:
         raise HTTPException(status_code=404, detail="Vehicle Master Record not found")
-    return ApiResponse[VehicleRegistrationMasterDetails](data=db_record)
+
+    history = None
+    if "history" in include_set:
+        history = get_action_history_for_records(db, "vehicle_registration_master", [db_record.id])[db_record.id]
+
+    data = build_master_details(db_record, include_set, history)
+    return ApiResponse[VehicleRegistrationMasterDetails](data=data)
+
+# build the details schema, relations that were not requested come back as None instead of []
+def build_master_details(record, include: set, history=None) -> VehicleRegistrationMasterDetails:
+    details = VehicleRegistrationMasterDetails.model_validate(record)
+    details.reciprocal_issued = None
+    details.reciprocal_received = None
+    if "contacts" not in include:
+        details.contacts = None
+    for key, field in (("undercover", "undercover_records"), ("fictitious", "fictitious_records")):
+        if key not in include:
+            setattr(details, field, None)
+        elif f"{key}.trap_info" not in include:
+            for child in getattr(details, field):
+                child.trap_info = None
+    if "documents" in include:
+        details.documents = [
+            DocumentSummary.model_validate(doc) for doc in record.documents if not doc.is_archived
+        ]
+    else:
+        details.documents = None
+    if "history" in include:
+        details.history = [to_action_log_out(log) for log in (history or [])]
+    return details
+
+# hydrate many masters in one call instead of one /details call per record
+@router.post("/batch-get", response_model=ApiResponse[List[BatchGetItem[VehicleRegistrationMasterDetails]]])
+def batch_get_masters(
+    payload: BatchGetRequest,
+    db: Session = Depends(get_read_db),
+    current_user: user_models.User = Depends(RoleChecker("Admin","Supervisor / Manager","User")),
+    permission_check = Depends(PermissionChecker("view_vr_records")),
+):
+    include = parse_master_include(payload.include)
+    records = get_masters_by_ids(db, payload.ids, include)
+
+    # history for every found master in one query
+    history = {}
+    if "history" in include:
+        found_ids = [record.id for record in records if record is not None]
+        history = get_action_history_for_records(db, "vehicle_registration_master", found_ids)
+
+    items = [
+        BatchGetItem[VehicleRegistrationMasterDetails](
+            id=record_id,
+            found=record is not None,
+            data=build_master_details(record, include, history.get(record_id)) if record is not None else None
+        )
+        for record_id, record in zip(payload.ids, records)
+    ]
+    found = sum(1 for item in items if item.found)
+    return ApiResponse(
+        status="success",
+        message=f"Found {found} of {len(items)} requested records",
+        data=items
+    )
 
 # get dropdown of masters
+# full snapshot for small deployments, etagged so the form can reuse its copy
 @router.get("/masters/dropdown")
 def get_masters_dropdown(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_user)
 ):
+    etag = f'W/"masters-{get_masters_snapshot_version(db)}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
     masters = get_all_masters_for_dropdown(db)
     return [{"id": m[0], "vin": m[1], "owner": m[2]} for m in masters]
 
+# typeahead over vin / plate / owner, capped so it stays fast as masters grow
+@router.get("/masters/typeahead")
+def get_masters_typeahead(
+    q: str = Query(..., min_length=1, max_length=50),
+    limit: int = Query(settings.TYPEAHEAD_DEFAULT_LIMIT, ge=1, le=settings.TYPEAHEAD_MAX_LIMIT),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    masters = search_masters_typeahead(db, q, limit)
+    return [{"id": m[0], "vin": m[1], "plate": m[2], "owner": m[3]} for m in masters]
+
 
 # create new contact for master record
 @router.post(
@@ -240,7 +366,7 @@ def create_vehicle_contact(
 )
 def get_vehicle_contacts(
     master_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: user_models.User = Depends(get_current_user)
 ):
 
@@ -274,7 +400,7 @@ def get_vehicle_contacts(
 )
 def get_single_contact(
     contact_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: user_models.User = Depends(get_current_user)
 ):
     try:
@@ -370,7 +496,7 @@ def delete_vehicle_contact(
 def list_all_contacts(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum records to return"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: user_models.User = Depends(get_current_user)
 ):
     try:
@@ -426,7 +552,7 @@ def create_ri(
 )
 def list_ri_for_master(
     master_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: user_models.User = Depends(get_current_user)
 ):
     try:
@@ -448,7 +574,7 @@ def list_ri_for_master(
 )
 def get_ri(
     reciprocal_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: user_models.User = Depends(get_current_user)
 ):
     try:
@@ -515,7 +641,7 @@ def delete_ri(
 def list_all_ri(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: user_models.User = Depends(get_current_user)
 ):
     try:
@@ -563,7 +689,7 @@ def create_rr(
 )
 def list_rr_for_master(
     master_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: user_models.User = Depends(get_current_user)
 ):
     try:
@@ -585,7 +711,7 @@ def list_rr_for_master(
 )
 def get_rr(
     reciprocal_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: user_models.User = Depends(get_current_user)
 ):
     try:
@@ -652,7 +778,7 @@ def delete_rr(
 def list_all_rr(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: user_models.User = Depends(get_current_user)
 ):
     try:
@@ -701,7 +827,7 @@ def create_ti_uc(
 )
 def list_ti_uc_for_undercover(
     undercover_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: user_models.User = Depends(get_current_user)
 ):
     try:
@@ -723,7 +849,7 @@ def list_ti_uc_for_undercover(
 )
 def get_ti_uc(
     trap_info_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: user_models.User = Depends(get_current_user)
 ):
     try:
@@ -790,7 +916,7 @@ def delete_ti_uc(
 def list_all_ti_uc(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: user_models.User = Depends(get_current_user)
 ):
     try:
@@ -839,7 +965,7 @@ def create_ti_fc(
 )
 def list_ti_fc_for_fictitious(
     fictitious_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: user_models.User = Depends(get_current_user)
 ):
     try:
@@ -861,7 +987,7 @@ def list_ti_fc_for_fictitious(
 )
 def get_ti_fc(
     trap_info_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: user_models.User = Depends(get_current_user)
 ):
     try:
@@ -928,7 +1054,7 @@ def delete_ti_fc(
 def list_all_ti_fc(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: user_models.User = Depends(get_current_user)
 ):
     try:
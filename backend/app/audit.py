@@ -0,0 +1,107 @@
+import logging
+import queue
+import threading
+import time
+from typing import List, Tuple
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+
+# audit sink for RecordActionLog / DocumentAuditLog rows.
+#   outbox (default): the audit row is added to the caller's session and lands in the same commit
+#       as the change it describes, so a write endpoint commits once and no audit row can be lost.
+#   buffered: rows are handed to a background writer after the caller commits and inserted in
+#       multi-row batches every AUDIT_BATCH_SIZE rows or AUDIT_FLUSH_SECONDS. cheaper under heavy
+#       write load, but rows still in the buffer are lost if the worker dies.
+
+logger = logging.getLogger(__name__)
+
+
+def record_audit(db: Session, model, **values):
+    if settings.AUDIT_MODE == "buffered":
+        db.info.setdefault("pending_audit", []).append((model, values))
+    else:
+        db.add(model(**values))
+
+
+@event.listens_for(Session, "after_commit")
+def _hand_off_after_commit(session):
+    for model, values in session.info.pop("pending_audit", []):
+        writer.put(model, values)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_on_rollback(session):
+    session.info.pop("pending_audit", None)
+
+
+class AuditWriter:
+    def __init__(self):
+        self._queue: "queue.Queue[Tuple[type, dict]]" = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def put(self, model, values: dict):
+        self._queue.put((model, values))
+        if self._thread is None:
+            self.start()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        # flushes whatever is still buffered
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def _run(self):
+        batch: List[Tuple[type, dict]] = []
+        deadline = time.monotonic() + settings.AUDIT_FLUSH_SECONDS
+        while True:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                pass
+            stopping = self._stop.is_set()
+            if len(batch) >= settings.AUDIT_BATCH_SIZE or time.monotonic() >= deadline or stopping:
+                if stopping:
+                    while not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                if batch:
+                    batch = self._flush(batch)
+                deadline = time.monotonic() + settings.AUDIT_FLUSH_SECONDS
+                if stopping:
+                    return
+
+    def _flush(self, batch: List[Tuple[type, dict]]) -> List[Tuple[type, dict]]:
+        by_model = {}
+        for model, values in batch:
+            by_model.setdefault(model, []).append(values)
+        db = SessionLocal()
+        try:
+            for model, rows in by_model.items():
+                db.execute(insert(model), rows)
+            db.commit()
+            return []
+        except Exception:
+            db.rollback()
+            logger.exception("audit flush of %s rows failed, will retry", len(batch))
+            # keep them for the next round, but don't grow without bound while the db is down
+            return batch[-settings.AUDIT_BATCH_SIZE * 50:]
+        finally:
+            db.close()
+
+
+writer = AuditWriter()
@@ -0,0 +1,190 @@
+import json
+import logging
+import select
+import threading
+from uuid import uuid4
+from typing import Dict, Hashable, Iterable, Optional
+
+from sqlalchemy import event, func, select as sa_select
+from sqlalchemy.orm import Session
+
+from app.database import engine
+
+# cache invalidation across uvicorn workers.
+# crud writers call invalidate(db, namespace, keys) inside their transaction; on postgres that queues a
+# NOTIFY which is delivered to every worker's listener on commit, on sqlite it is local to this process.
+# local caches are evicted after commit in the writing worker as well.
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "pru_cache_invalidation"
+MAX_PAYLOAD_KEYS = 200  # more keys than this and the namespace is flushed instead (NOTIFY payload limit)
+RECONNECT_MAX_SECONDS = 30
+INSTANCE_ID = uuid4().hex  # pids can repeat across hosts
+
+
+# per-process cache for one namespace, keys should be str/int so they survive the json payload.
+# also_flush_on: other namespaces whose invalidations clear this cache too.
+# generation goes up with every evict/clear; a reader that loads from the db reads it first and passes it
+# to set(), so a value loaded before a concurrent invalidation is dropped instead of cached stale
+class LocalCache:
+    def __init__(self, namespace: str, also_flush_on: Iterable[str] = ()):
+        self.namespace = namespace
+        self.generation = 0
+        self._data: Dict[Hashable, object] = {}
+        self._lock = threading.Lock()
+        _caches.setdefault(namespace, []).append(self)
+        for other in also_flush_on:
+            _caches.setdefault(other, []).append(_Flusher(self))
+
+    def get(self, key: Hashable, default=None):
+        # while the listener is down other workers' writes can't reach us, so don't serve from memory
+        if not listener.healthy:
+            return default
+        return self._data.get(key, default)
+
+    def set(self, key: Hashable, value, generation: Optional[int] = None):
+        if not listener.healthy:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = value
+
+    def evict(self, keys: Iterable[Hashable]):
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+
+class _Flusher:
+    # any invalidation in the other namespace, whatever the keys, clears the whole cache
+    def __init__(self, cache: LocalCache):
+        self.cache = cache
+
+    def evict(self, keys):
+        self.cache.clear()
+
+    def clear(self):
+        self.cache.clear()
+
+
+_caches: Dict[str, list] = {}
+
+
+def _apply(namespace: str, keys: Optional[list]):
+    targets = _caches.get(namespace, []) if namespace != "*" else [c for cs in _caches.values() for c in cs]
+    for cache in targets:
+        if keys is None:
+            cache.clear()
+        else:
+            cache.evict(keys)
+
+
+def flush_all():
+    _apply("*", None)
+
+
+def invalidate(db: Session, namespace: str, keys: Optional[Iterable[Hashable]] = None):
+    keys = list(keys) if keys is not None else None
+    if keys is not None and len(keys) > MAX_PAYLOAD_KEYS:
+        keys = None
+
+    db.info.setdefault("cache_invalidations", []).append((namespace, keys))
+
+    if db.get_bind().dialect.name == "postgresql":
+        payload = json.dumps({"ns": namespace, "keys": keys, "src": INSTANCE_ID}, default=str)
+        db.execute(sa_select(func.pg_notify(CHANNEL, payload)))
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_after_commit(session):
+    for namespace, keys in session.info.pop("cache_invalidations", []):
+        _apply(namespace, keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_on_rollback(session):
+    session.info.pop("cache_invalidations", None)
+
+
+class InvalidationListener:
+    def __init__(self):
+        self.healthy = True
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        # single node sqlite, the after_commit hook is all we need
+        if engine.dialect.name != "postgresql" or self._thread is not None:
+            return
+        self.healthy = False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-invalidation-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _connect(self):
+        # dedicated connection outside the pool, it sits in LISTEN for the life of the worker
+        cargs, cparams = engine.dialect.create_connect_args(engine.url)
+        conn = engine.dialect.connect(*cargs, **cparams)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {CHANNEL}")
+        return conn
+
+    def _run(self):
+        backoff = 1
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                # anything sent while we were disconnected is lost, start from empty caches
+                flush_all()
+                self.healthy = True
+                backoff = 1
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        # idle, make sure the connection is still alive (half-open tcp never errors)
+                        with conn.cursor() as cur:
+                            cur.execute("SELECT 1")
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._handle(conn.notifies.pop(0).payload)
+            except Exception:
+                logger.exception("cache invalidation listener failed, retrying in %ss", backoff)
+            finally:
+                self.healthy = False
+                flush_all()
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX_SECONDS)
+
+    def _handle(self, payload: str):
+        try:
+            message = json.loads(payload)
+            # our own commits were already applied by the after_commit hook
+            if message.get("src") == INSTANCE_ID:
+                return
+            _apply(message["ns"], message.get("keys"))
+        except (ValueError, KeyError, TypeError):
+            flush_all()
+
+
+listener = InvalidationListener()
@@ -6,6 +6,11 @@ load_dotenv()
 class Settings:
     DATABASE_URL: str = os.getenv("DATABASE_URL")
 
+    #optional read replica for listings/details/dashboard, unset means everything goes to DATABASE_URL
+    REPLICA_DATABASE_URL: str = os.getenv("REPLICA_DATABASE_URL")
+    #how long a user reads from the primary after they write, covers replica lag
+    READ_YOUR_WRITES_SECONDS: int = int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
     SECRET_KEY: str = os.getenv("SECRET_KEY", "dev-secret-key")
 
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
@@ -15,4 +20,95 @@ class Settings:
     DEFAULT_PAGE_SIZE: int = 25
     MAX_PAGE_SIZE: int = 100
 
+    #for batch lookups by id
+    BATCH_GET_MAX_IDS: int = 1000
+
+    #for bulk role assignment (POST /admin/users/roles/bulk)
+    BULK_ROLE_ASSIGNMENT_MAX: int = 1000
+
+    #for the masters typeahead
+    TYPEAHEAD_DEFAULT_LIMIT: int = 10
+    TYPEAHEAD_MAX_LIMIT: int = 50
+
+    #admission control per route class (per worker): (concurrent requests, queued requests).
+    #keep the sum under the db pool size (5 + 10 overflow by default)
+    ADMISSION_LIMITS = {
+        "read": (6, 24),
+        "write": (4, 16),
+        "export": (1, 2),
+        "auth": (2, 8),
+    }
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "5"))
+    ADMISSION_RETRY_AFTER_SECONDS: int = 2
+
+    #postgres statement_timeout (ms) per route class, 0 = no limit; path prefix overrides win
+    STATEMENT_TIMEOUT_MS = {
+        "read": 15000,
+        "write": 30000,
+        "export": 120000,
+        "auth": 5000,
+    }
+    STATEMENT_TIMEOUT_OVERRIDES_MS = {
+        "/api/dashboard": 10000,
+        "/api/vehicle-registration/masters/typeahead": 2000,
+    }
+
+    #Idempotency-Key support for create/action/upload posts
+    IDEMPOTENCY_TTL_HOURS: int = 24
+    IDEMPOTENCY_SWEEP_SECONDS: int = 600
+    IDEMPOTENCY_MAX_BODY_BYTES: int = 1024 * 1024  # bigger json bodies are not buffered for hashing
+
+    #audit rows: "outbox" writes them in the caller's transaction, "buffered" batches them in the background
+    AUDIT_MODE: str = os.getenv("AUDIT_MODE", "outbox")
+    AUDIT_BATCH_SIZE: int = 200
+    AUDIT_FLUSH_SECONDS: float = 1.0
+
+    #document storage: "local" (LOCAL_STORAGE_DIR) or "s3" (any s3-compatible store, e.g. minio via S3_ENDPOINT_URL)
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "local")
+    LOCAL_STORAGE_DIR: str = os.getenv("LOCAL_STORAGE_DIR", "app/static/uploads")
+    S3_BUCKET: str = os.getenv("S3_BUCKET")
+    S3_PREFIX: str = os.getenv("S3_PREFIX", "documents/")
+    S3_ENDPOINT_URL: str = os.getenv("S3_ENDPOINT_URL")
+    S3_REGION: str = os.getenv("S3_REGION", "us-west-1")
+    S3_ACCESS_KEY_ID: str = os.getenv("S3_ACCESS_KEY_ID")
+    S3_SECRET_ACCESS_KEY: str = os.getenv("S3_SECRET_ACCESS_KEY")
+    S3_MULTIPART_CHUNK_MB: int = 8
+    PRESIGNED_URL_SECONDS: int = 900
+    PRESIGN_MIN_BYTES: int = 1024 * 1024  # smaller downloads are streamed through the api
+
+    #tiering of old documents (python -m app.utils.tier_documents): compressed and moved to the cold tier
+    TIERING_AGE_DAYS: int = int(os.getenv("TIERING_AGE_DAYS", "365"))
+    TIERING_TARGET: str = os.getenv("TIERING_TARGET", "cold-local")  # cold-local or cold-s3
+    TIERING_CODEC: str = os.getenv("TIERING_CODEC", "zstd")  # zstd (zstandard package, gzip if it is missing) or gzip
+    TIERING_ZSTD_LEVEL: int = 10
+    TIERING_BATCH_SIZE: int = 100
+    COLD_STORAGE_DIR: str = os.getenv("COLD_STORAGE_DIR", "app/cold_storage")
+    S3_COLD_BUCKET: str = os.getenv("S3_COLD_BUCKET")
+
+    #integrity scrubber (python -m app.utils.scrub_documents), io limit keeps it from starving the api
+    SCRUB_BATCH_SIZE: int = 200
+    SCRUB_WORKERS: int = 4
+    SCRUB_MAX_MB_PER_SECOND: float = float(os.getenv("SCRUB_MAX_MB_PER_SECOND", "50"))
+
+    #document previews (app/previews.py), rendered in a process pool and cached by content hash
+    PREVIEWS_ENABLED: bool = os.getenv("PREVIEWS_ENABLED", "true").lower() == "true"
+    PREVIEW_CACHE_DIR: str = os.getenv("PREVIEW_CACHE_DIR", "app/preview_cache")
+    PREVIEW_WORKERS: int = 2
+    PREVIEW_FORMAT: str = "webp"  # webp or png
+    PREVIEW_THUMB_PX: int = 256
+    PREVIEW_PAGE_PX: int = 1024
+    PREVIEW_MAX_PAGES: int = 3
+    PREVIEW_RENDER_TIMEOUT_SECONDS: float = 10
+
+    #batch document upload (several files or one zip)
+    BATCH_UPLOAD_MAX_FILES: int = 500
+    BATCH_UPLOAD_MAX_BYTES: int = 2 * 1024 * 1024 * 1024  # uncompressed, guards against zip bombs
+    BATCH_UPLOAD_WORKERS: int = 8
+
+    #OCR auto-link pipeline, 0 interval = only run through POST /api/documents/auto-link
+    AUTO_LINK_BATCH_SIZE: int = 500
+    AUTO_LINK_INTERVAL_SECONDS: int = int(os.getenv("AUTO_LINK_INTERVAL_SECONDS", "60"))
+    AUTO_LINK_MIN_CONFIDENCE: float = 0.3
+    AUTO_LINK_MAX_BATCHES_PER_REQUEST: int = 10  # manual runs stay short, the loop drains the rest
+
 settings = Settings()
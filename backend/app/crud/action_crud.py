@@ -1,14 +1,18 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Dict, List, Optional
 from app.models import VehicleRegistrationMaster, RecordActionLog, ActionType, user_models
-from app.schemas.action_schema import ActionRequest
+from app.schemas.action_schema import ActionRequest, ActionLogOut
 from app.models import user_models
 from app.models.driving_license import DriverLicenseOriginalRecord
+from app.events import publish_change
+from app.audit import record_audit
+from app.reference_data import get_reference_data
 
 def get_action_type_by_name(db: Session, action_name: str):
-    return db.query(ActionType).filter(ActionType.name == action_name).first()
+    # from the in-process reference cache, action types only change through a deploy
+    return get_reference_data(db).action_types_by_name.get(action_name)
 
 def get_record_by_id(db: Session, record_id: str):
     return db.query(VehicleRegistrationMaster).filter(
@@ -47,34 +51,60 @@ def perform_record_action(
         record.approval_status = "pending"
     else:
         raise ValueError(f"Unsupported action type: {action_data.action_type}")
-    # create the log entry using the authenticated user's ID
-    log_entry = RecordActionLog(
-        record_table=action_data.record_table,
-        record_id=action_data.record_id,
+    new_status = record.approval_status
+    timestamp = datetime.now(timezone.utc)
+    # create the log entry using the authenticated user's ID, committed together with the status change
+    record_audit(
+        db, RecordActionLog,
+        record_type=action_data.record_table,
+        record_id=record.id,
         action_type_id=action_type.id,
-        user_id=current_user.id, #use the ID from the token/dependency
+        user_id=str(current_user.id), #use the ID from the token/dependency
         notes=action_data.notes,
-        created_at=datetime.now(timezone.utc),
+        timestamp=timestamp,
         ip_address=ip_address or "unknown"
     )
-    db.add(log_entry)
-    db.add(record)
     db.commit()
-    db.refresh(record)
-    db.refresh(log_entry)
+    publish_change("vr_master", new_status, [record.id])
     return {
         "record": record,
-        "log_entry": log_entry,
+        "timestamp": timestamp,
         "old_status": old_status,
-        "new_status": record.approval_status
+        "new_status": new_status
     }
 
 # get hitory
 def get_record_action_history(db: Session, record_id: str):
     return db.query(RecordActionLog).join(ActionType).filter(
         RecordActionLog.record_id == record_id,
-        RecordActionLog.record_table == "vehicle_registration_master"
-    ).order_by(RecordActionLog.created_at.desc()).all()
+        RecordActionLog.record_type == "vehicle_registration_master"
+    ).order_by(RecordActionLog.timestamp.desc()).all()
+
+# history for many records of one type in a single query, keyed by record id
+def get_action_history_for_records(db: Session, record_type: str, record_ids: List[int]) -> Dict[int, List[RecordActionLog]]:
+    logs = db.query(RecordActionLog).options(
+        joinedload(RecordActionLog.action_type)
+    ).filter(
+        RecordActionLog.record_type == record_type,
+        RecordActionLog.record_id.in_(record_ids)
+    ).order_by(RecordActionLog.timestamp.desc()).all()
+
+    history = {record_id: [] for record_id in record_ids}
+    for log in logs:
+        history.setdefault(log.record_id, []).append(log)
+    return history
+
+def to_action_log_out(log: RecordActionLog) -> ActionLogOut:
+    return ActionLogOut(
+        id=log.id,
+        record_table=log.record_type,
+        record_id=str(log.record_id),
+        action_type_name=log.action_type.name if log.action_type else "unknown",
+        user_id=log.user_id,
+        notes=log.notes,
+        created_at=log.timestamp,
+        ip_address=log.ip_address
+    )
 
 # DL FUNCTIONS
 
@@ -126,29 +156,27 @@ def perform_dl_record_action(
     else:
         raise ValueError(f"Unsupported action type: {action_type_name}")
 
-    # log entry
-    log_entry = RecordActionLog(
-    record_type="driver_license_original",
-    record_id=record_id,
-    action_type_id=action_type.id,
-    user_id=str(current_user.id),
-    notes=notes,
-    timestamp=datetime.now(timezone.utc),
-    ip_address=ip_address or "unknown"
-)
-
-
-    db.add(log_entry)
-    db.add(record)
+    new_status = record.approval_status
+    timestamp = datetime.now(timezone.utc)
+    # log entry, same commit as the status change
+    record_audit(
+        db, RecordActionLog,
+        record_type="driver_license_original",
+        record_id=record_id,
+        action_type_id=action_type.id,
+        user_id=str(current_user.id),
+        notes=notes,
+        timestamp=timestamp,
+        ip_address=ip_address or "unknown"
+    )
     db.commit()
-    db.refresh(record)
-    db.refresh(log_entry)
+    publish_change("dl_original", new_status, [record.id])
 
     return {
         "record": record,
-        "log_entry": log_entry,
+        "timestamp": timestamp,
         "old_status": old_status,
-        "new_status": record.approval_status
+        "new_status": new_status
     }
 
 #action history for dl
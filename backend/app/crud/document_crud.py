@@ -0,0 +1,87 @@
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import tuple_, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+from app.models.document_library import CREATED_AT_FLOOR, DocumentLibrary, created_sort_key, ocr_field
+from app.utils.fieldsets import load_only_option
+
+# columns behind the list rows, ocr_response_json stays on the detail endpoint
+DOCUMENT_LIST_COLUMNS = [
+    "id", "document_name", "document_type", "document_size", "document_url", "status",
+    "content_type", "created_at", "created_by", "master_record_id", "is_archived",
+]
+
+# keyset cursor over (coalesce(created_at, epoch), id), opaque to the client
+def encode_document_cursor(doc: DocumentLibrary) -> str:
+    raw = f"{(doc.created_at or CREATED_AT_FLOOR).isoformat()}|{doc.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_document_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, doc_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(doc_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# one page of non-archived documents, newest first, rows without a created_at last.
+# served by ix_document_library_archived_type_created / ix_document_library_archived_created
+def get_documents_page(
+    db: Session,
+    limit: int = 25,
+    cursor: Optional[str] = None,
+    document_type: Optional[str] = None,
+    master_record_id: Optional[int] = None,
+    status: Optional[str] = None,
+    uploaded_by: Optional[int] = None,
+    fields: Optional[List[str]] = None
+) -> Tuple[List[DocumentLibrary], Optional[str]]:
+    # the cursor needs created_at and id whatever was asked for
+    columns = list(dict.fromkeys((fields or DOCUMENT_LIST_COLUMNS) + ["id", "created_at"]))
+    query = db.query(DocumentLibrary).options(load_only_option(DocumentLibrary, columns))
+
+    query = query.filter(DocumentLibrary.is_archived == False)
+    if document_type:
+        query = query.filter(DocumentLibrary.document_type == document_type)
+    if master_record_id is not None:
+        query = query.filter(DocumentLibrary.master_record_id == master_record_id)
+    if status:
+        query = query.filter(DocumentLibrary.status == status)
+    if uploaded_by is not None:
+        query = query.filter(DocumentLibrary.created_by == uploaded_by)
+
+    sort_key = created_sort_key(DocumentLibrary.created_at)
+    if cursor:
+        created_at, doc_id = decode_document_cursor(cursor)
+        query = query.filter(tuple_(sort_key, DocumentLibrary.id) < tuple_(created_at, doc_id))
+
+    # one extra row tells us if there is a next page
+    docs = query.order_by(sort_key.desc(), DocumentLibrary.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_document_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+# documents whose OCR result matches the given fields.
+# plate / vin go through the ix_document_library_ocr_{plate,vin} expression indexes,
+# any other field through the gin index (@> containment) on postgres
+def find_documents_by_ocr(
+    db: Session,
+    plate: Optional[str] = None,
+    vin: Optional[str] = None,
+    other_fields: Optional[dict] = None,
+    limit: int = 25
+) -> List[DocumentLibrary]:
+    query = db.query(DocumentLibrary).options(load_only_option(DocumentLibrary, DOCUMENT_LIST_COLUMNS))
+    query = query.filter(DocumentLibrary.is_archived == False)
+    if plate:
+        query = query.filter(ocr_field(DocumentLibrary.ocr_response_json, "plate") == plate.strip().upper())
+    if vin:
+        query = query.filter(ocr_field(DocumentLibrary.ocr_response_json, "vin") == vin.strip().upper())
+    if other_fields:
+        if db.get_bind().dialect.name == "postgresql":
+            query = query.filter(type_coerce(DocumentLibrary.ocr_response_json, JSONB).contains({"fields": other_fields}))
+        else:
+            for name, value in other_fields.items():
+                query = query.filter(DocumentLibrary.ocr_response_json[("fields", name)].as_string() == value)
+    return query.order_by(DocumentLibrary.created_at.desc(), DocumentLibrary.id.desc()).limit(limit).all()
@@ -0,0 +1,228 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, insert, or_
+from sqlalchemy.orm import Session, load_only, undefer
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import SessionLocal
+from app.events import publish_change
+from app.models.document_library import DocumentLibrary, DocumentRecordLink
+from app.models.driving_license import DriverLicenseOriginalRecord
+from app.models.vehicle_registration import VehicleRegistrationMaster
+
+# OCR -> record auto-linking. documents with a completed OCR result are taken in id order, batch by batch;
+# for each batch the VIN / plate / owner / DL number values are collected and resolved with one
+# VR query and one DL query (through the upper(col) indexes), and every candidate is written as a
+# proposed DocumentRecordLink with a confidence score for a reviewer to accept or reject.
+
+logger = logging.getLogger(__name__)
+
+# score per matching field, summed and scaled by the OCR confidence
+VR_WEIGHTS = {"vin": 0.55, "plate": 0.35, "owner": 0.10}
+DL_WEIGHTS = {"dl": 0.70, "owner": 0.30}
+
+
+def _norm(value) -> Optional[str]:
+    if value is None:
+        return None
+    value = " ".join(str(value).split()).upper()
+    return value or None
+
+
+def extract_ocr_fields(ocr: Optional[dict]) -> Dict[str, Optional[str]]:
+    fields = (ocr or {}).get("fields") or {}
+    return {
+        "vin": _norm(fields.get("vin")),
+        "plate": _norm(fields.get("plate")),
+        "owner": _norm(fields.get("owner")),
+        "dl": _norm(fields.get("dl_number") or fields.get("license_number") or fields.get("dl")),
+    }
+
+
+def _ocr_confidence(ocr: Optional[dict]) -> float:
+    try:
+        value = float((ocr or {}).get("confidence", 100))
+    except (TypeError, ValueError):
+        return 1.0
+    # abbyy reports a percentage
+    return max(0.0, min(1.0, value / 100 if value > 1 else value))
+
+
+def _score(weights: Dict[str, float], matched: List[str], ocr_confidence: float) -> float:
+    return round(min(1.0, sum(weights[name] for name in matched)) * ocr_confidence, 3)
+
+
+def _lookup_vr(db: Session, extracted: List[Dict[str, Optional[str]]]) -> List[VehicleRegistrationMaster]:
+    vins = {e["vin"] for e in extracted if e["vin"]}
+    plates = {e["plate"] for e in extracted if e["plate"]}
+    if not vins and not plates:
+        return []
+    conditions = []
+    if vins:
+        conditions.append(func.upper(VehicleRegistrationMaster.vehicle_id_number).in_(vins))
+    if plates:
+        conditions.append(func.upper(VehicleRegistrationMaster.license_number).in_(plates))
+    return db.query(VehicleRegistrationMaster).options(load_only(
+        VehicleRegistrationMaster.id,
+        VehicleRegistrationMaster.vehicle_id_number,
+        VehicleRegistrationMaster.license_number,
+        VehicleRegistrationMaster.registered_owner
+    )).filter(or_(*conditions)).all()
+
+
+def _lookup_dl(db: Session, extracted: List[Dict[str, Optional[str]]]) -> List[DriverLicenseOriginalRecord]:
+    numbers = {e["dl"] for e in extracted if e["dl"]}
+    if not numbers:
+        return []
+    return db.query(DriverLicenseOriginalRecord).options(load_only(
+        DriverLicenseOriginalRecord.id,
+        DriverLicenseOriginalRecord.tdl,
+        DriverLicenseOriginalRecord.fdl,
+        DriverLicenseOriginalRecord.tfn,
+        DriverLicenseOriginalRecord.tln,
+        DriverLicenseOriginalRecord.ffn,
+        DriverLicenseOriginalRecord.fln
+    )).filter(or_(
+        func.upper(DriverLicenseOriginalRecord.tdl).in_(numbers),
+        func.upper(DriverLicenseOriginalRecord.fdl).in_(numbers)
+    )).all()
+
+
+def propose_links_for_batch(db: Session, batch_size: int) -> Tuple[int, int]:
+    # returns (documents processed, links proposed), commits once per batch.
+    # the batch is claimed with FOR UPDATE SKIP LOCKED (postgres, sqlite ignores it) until that commit,
+    # so the loops in other workers and a manual run take different documents instead of colliding
+    docs = db.query(DocumentLibrary).options(
+        load_only(DocumentLibrary.id),
+        undefer(DocumentLibrary.ocr_response_json)
+    ).filter(
+        DocumentLibrary.status == "completed",
+        DocumentLibrary.is_archived == False,
+        DocumentLibrary.links_proposed_at.is_(None),
+        DocumentLibrary.ocr_response_json.isnot(None)
+    ).order_by(DocumentLibrary.id).limit(batch_size).with_for_update(
+        skip_locked=True, of=DocumentLibrary
+    ).all()
+    if not docs:
+        db.rollback()
+        return 0, 0
+
+    extracted = [extract_ocr_fields(doc.ocr_response_json) for doc in docs]
+
+    # one lookup per table for the whole batch, then match in memory
+    vr_by_vin, vr_by_plate = {}, {}
+    for vr in _lookup_vr(db, extracted):
+        if vr.vehicle_id_number:
+            vr_by_vin.setdefault(_norm(vr.vehicle_id_number), []).append(vr)
+        if vr.license_number:
+            vr_by_plate.setdefault(_norm(vr.license_number), []).append(vr)
+    dl_by_number = {}
+    for dl in _lookup_dl(db, extracted):
+        for number in {_norm(dl.tdl), _norm(dl.fdl)} - {None}:
+            dl_by_number.setdefault(number, []).append(dl)
+
+    rows = []
+    for doc, fields in zip(docs, extracted):
+        ocr_confidence = _ocr_confidence(doc.ocr_response_json)
+
+        vr_matches: Dict[int, Tuple[VehicleRegistrationMaster, List[str]]] = {}
+        for name, index in (("vin", vr_by_vin), ("plate", vr_by_plate)):
+            for vr in index.get(fields[name], []) if fields[name] else []:
+                vr_matches.setdefault(vr.id, (vr, []))[1].append(name)
+        for vr, matched in vr_matches.values():
+            if fields["owner"] and _norm(vr.registered_owner) == fields["owner"]:
+                matched.append("owner")
+            rows.append(("vr", vr.id, matched, _score(VR_WEIGHTS, matched, ocr_confidence), doc.id))
+
+        seen_dl = set()
+        for dl in dl_by_number.get(fields["dl"], []) if fields["dl"] else []:
+            if dl.id in seen_dl:
+                continue
+            seen_dl.add(dl.id)
+            matched = ["dl"]
+            names = {_norm(f"{dl.tfn or ''} {dl.tln or ''}"), _norm(f"{dl.ffn or ''} {dl.fln or ''}")}
+            if fields["owner"] and fields["owner"] in names:
+                matched.append("owner")
+            rows.append(("dl", dl.id, matched, _score(DL_WEIGHTS, matched, ocr_confidence), doc.id))
+
+    # a rerun after new OCR replaces open proposals but keeps what a reviewer already decided
+    doc_ids = [doc.id for doc in docs]
+    reviewed = {
+        (link.document_id, link.record_type, link.record_id)
+        for link in db.query(DocumentRecordLink).options(load_only(
+            DocumentRecordLink.document_id, DocumentRecordLink.record_type, DocumentRecordLink.record_id
+        )).filter(
+            DocumentRecordLink.document_id.in_(doc_ids),
+            DocumentRecordLink.status != "proposed"
+        )
+    }
+    db.query(DocumentRecordLink).filter(
+        DocumentRecordLink.document_id.in_(doc_ids),
+        DocumentRecordLink.status == "proposed"
+    ).delete(synchronize_session=False)
+
+    now = datetime.utcnow()
+    links = [
+        {
+            "document_id": doc_id,
+            "record_type": record_type,
+            "record_id": record_id,
+            "confidence": confidence,
+            "matched_on": ",".join(matched),
+            "status": "proposed",
+            "created_at": now,
+        }
+        for record_type, record_id, matched, confidence, doc_id in rows
+        if confidence >= settings.AUTO_LINK_MIN_CONFIDENCE and (doc_id, record_type, record_id) not in reviewed
+    ]
+    if links:
+        db.execute(insert(DocumentRecordLink), links)
+    db.query(DocumentLibrary).filter(DocumentLibrary.id.in_(doc_ids)).update(
+        {DocumentLibrary.links_proposed_at: now}, synchronize_session=False
+    )
+    db.commit()
+    if links:
+        publish_change("document", "links_proposed", sorted({link["document_id"] for link in links}))
+    return len(docs), len(links)
+
+
+def run_auto_link(db: Session, batch_size: Optional[int] = None, max_batches: Optional[int] = None) -> Dict[str, int]:
+    batch_size = batch_size or settings.AUTO_LINK_BATCH_SIZE
+    totals = {"batches": 0, "documents_processed": 0, "links_proposed": 0}
+    while max_batches is None or totals["batches"] < max_batches:
+        processed, proposed = propose_links_for_batch(db, batch_size)
+        if not processed:
+            break
+        totals["batches"] += 1
+        totals["documents_processed"] += processed
+        totals["links_proposed"] += proposed
+    return totals
+
+
+def _run_auto_link_once() -> Dict[str, int]:
+    db = SessionLocal()
+    try:
+        return run_auto_link(db)
+    finally:
+        db.close()
+
+
+async def auto_link_loop():
+    while True:
+        await asyncio.sleep(settings.AUTO_LINK_INTERVAL_SECONDS)
+        try:
+            totals = await run_in_threadpool(_run_auto_link_once)
+            if totals["documents_processed"]:
+                logger.info("auto-link: %s", totals)
+        except Exception:
+            logger.exception("auto-link run failed")
+
+
+def get_document_links(db: Session, document_id: int) -> List[DocumentRecordLink]:
+    return db.query(DocumentRecordLink).filter(
+        DocumentRecordLink.document_id == document_id
+    ).order_by(DocumentRecordLink.confidence.desc(), DocumentRecordLink.id).all()
@@ -0,0 +1,116 @@
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from app.crud.document_crud import DOCUMENT_LIST_COLUMNS
+from app.models.document_library import DocumentLibrary
+from app.utils.fieldsets import load_only_option
+
+# full-text search over document name (weight A), OCR text and fields (B) and audit notes (C).
+# postgres keeps a tsvector per document (gin indexed), sqlite an fts5 row per document;
+# both are refreshed by refresh_document_search whenever a document's name, OCR result or notes change.
+# documents from before the index existed are backfilled with python -m app.utils.reindex_documents.
+
+HIGHLIGHT_START, HIGHLIGHT_STOP = "<mark>", "</mark>"
+
+_PG_REFRESH = text("""
+    UPDATE document_library d SET search_vector =
+        setweight(to_tsvector('english', translate(coalesce(d.document_name, ''), '_-.', '   ')), 'A') ||
+        setweight(to_tsvector('english', coalesce(d.ocr_response_json, '{}'::jsonb)), 'B') ||
+        setweight(to_tsvector('english', coalesce(
+            (SELECT string_agg(a.notes, ' ') FROM document_audit_log a WHERE a.document_id = d.id), ''
+        )), 'C')
+    WHERE d.id = ANY(:ids)
+""")
+
+_SQLITE_DELETE = text("DELETE FROM document_library_fts WHERE doc_id IN (SELECT value FROM json_each(:ids))")
+_SQLITE_INSERT = text("""
+    INSERT INTO document_library_fts (doc_id, name, body, notes)
+    SELECT d.id,
+           d.document_name,
+           coalesce(json_extract(d.ocr_response_json, '$.text'), '') || ' ' || coalesce(
+               (SELECT group_concat(f.value, ' ') FROM json_each(d.ocr_response_json, '$.fields') f), ''),
+           (SELECT group_concat(a.notes, ' ') FROM document_audit_log a WHERE a.document_id = d.id)
+    FROM document_library d
+    WHERE d.id IN (SELECT value FROM json_each(:ids))
+""")
+
+
+def _is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def refresh_document_search(db: Session, doc_ids: List[int]):
+    # runs in the caller's transaction, commit is up to the caller
+    if not doc_ids:
+        return
+    db.flush()
+    if _is_postgres(db):
+        db.execute(_PG_REFRESH, {"ids": list(doc_ids)})
+    else:
+        ids = "[" + ",".join(str(int(doc_id)) for doc_id in doc_ids) + "]"
+        db.execute(_SQLITE_DELETE, {"ids": ids})
+        db.execute(_SQLITE_INSERT, {"ids": ids})
+
+
+def _fts5_query(q: str) -> str:
+    # every word as a quoted term (implicit AND), so user input can't hit fts5 query syntax
+    return " ".join(f'"{word}"' for word in re.findall(r"\w+", q))
+
+
+def search_documents(
+    db: Session,
+    q: str,
+    limit: int = 25,
+    offset: int = 0,
+    document_type: Optional[str] = None
+) -> List[Tuple[DocumentLibrary, float, Optional[str]]]:
+    # (document, rank, highlight) best match first; higher rank is better
+    if _is_postgres(db):
+        query = func.websearch_to_tsquery("english", q)
+        rank = func.ts_rank_cd(DocumentLibrary.search_vector, query)
+        hits = db.query(DocumentLibrary.id.label("id"), rank.label("rank")).filter(
+            DocumentLibrary.search_vector.op("@@")(query),
+            DocumentLibrary.is_archived == False
+        )
+        if document_type:
+            hits = hits.filter(DocumentLibrary.document_type == document_type)
+        hits = hits.order_by(rank.desc(), DocumentLibrary.id.desc()).limit(limit).offset(offset).subquery()
+
+        # headlines are expensive, only build them for the page
+        headline = func.ts_headline(
+            "english",
+            func.coalesce(DocumentLibrary.ocr_response_json["text"].as_string(), DocumentLibrary.document_name),
+            query,
+            f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxFragments=2, MinWords=5, MaxWords=20"
+        )
+        rows = db.query(DocumentLibrary, hits.c.rank, headline).options(
+            load_only_option(DocumentLibrary, DOCUMENT_LIST_COLUMNS)
+        ).join(hits, hits.c.id == DocumentLibrary.id).order_by(hits.c.rank.desc(), DocumentLibrary.id.desc()).all()
+        return [(doc, float(doc_rank), highlight) for doc, doc_rank, highlight in rows]
+
+    match = _fts5_query(q)
+    if not match:
+        return []
+    sql = f"""
+        SELECT f.doc_id, -bm25(document_library_fts, 0.0, 10.0, 4.0, 1.0) AS rank,
+               snippet(document_library_fts, -1, '{HIGHLIGHT_START}', '{HIGHLIGHT_STOP}', '…', 12) AS highlight
+        FROM document_library_fts f JOIN document_library d ON d.id = f.doc_id
+        WHERE document_library_fts MATCH :match AND d.is_archived = 0
+        {"AND d.document_type = :document_type" if document_type else ""}
+        ORDER BY rank DESC, f.doc_id DESC
+        LIMIT :limit OFFSET :offset
+    """
+    hits = db.execute(text(sql), {
+        "match": match, "document_type": document_type, "limit": limit, "offset": offset
+    }).all()
+    if not hits:
+        return []
+    docs = {
+        doc.id: doc for doc in db.query(DocumentLibrary).options(
+            load_only_option(DocumentLibrary, DOCUMENT_LIST_COLUMNS)
+        ).filter(DocumentLibrary.id.in_([hit.doc_id for hit in hits]))
+    }
+    return [(docs[hit.doc_id], float(hit.rank), hit.highlight or None) for hit in hits if hit.doc_id in docs]
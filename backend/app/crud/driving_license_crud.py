@@ -1,5 +1,5 @@
 from fastapi import HTTPException
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, joinedload, noload, selectinload
 from typing import List, Optional
 from app.models.driving_license import (
     DriverLicenseOriginalRecord,
@@ -14,6 +14,8 @@ from app.schemas.driving_license_schema import (
     DriverLicenseSearchQuery
 )
 from app.models.base import ActionType
+from app.utils.fieldsets import load_only_option
+from app.utils.pagination import Page, TotalMode, paginate
 from app.models import driving_license
 
 
@@ -139,9 +141,15 @@ def get_all_records(
     limit: int = 100,
     active_status: Optional[str] = None,
     approval_status: Optional[str] = None,
-    active_only: Optional[bool] = True
-):
+    active_only: Optional[bool] = True,
+    fields: Optional[List[str]] = None,
+    total_mode: TotalMode = "none"
+) -> Page:
     query = db.query(DriverLicenseOriginalRecord)
+
+    # sparse fieldset, only load the requested columns
+    if fields:
+        query = query.options(load_only_option(DriverLicenseOriginalRecord, fields))
     
     # filters
     if active_only:
@@ -158,9 +166,7 @@ def get_all_records(
 
     query = query.filter(DriverLicenseOriginalRecord.is_suppressed == False)
     
-    records = query.offset(skip).limit(limit).all()
-    
-    return records
+    return paginate(query, skip, limit, total_mode)
 
 # single record with all related record 
 def get_record_by_id(db: Session, record_id: int):
@@ -177,6 +183,36 @@ def get_record_by_id(db: Session, record_id: int):
     
     return record
 
+# relations that can be requested with include= on batch lookups
+RECORD_INCLUDE_OPTIONS = {
+    "contacts": selectinload(DriverLicenseOriginalRecord.contacts),
+    "fictitious_traps": selectinload(DriverLicenseOriginalRecord.fictitious_traps),
+}
+
+def parse_record_include(include: Optional[List[str]]) -> set:
+    requested = {part.strip() for part in (include or []) if part and part.strip()}
+    unknown = requested - set(RECORD_INCLUDE_OPTIONS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown include value(s): {', '.join(sorted(unknown))}. "
+                   f"Allowed: {', '.join(RECORD_INCLUDE_OPTIONS)}"
+        )
+    return requested
+
+# many records in one IN query, returned in request order with None for missing ids
+def get_records_by_ids(db: Session, record_ids: List[int], include: Optional[set] = None):
+    options = [RECORD_INCLUDE_OPTIONS[key] for key in (include or set())]
+    records = db.query(DriverLicenseOriginalRecord).options(
+        *options,
+        noload("*")
+    ).filter(
+        DriverLicenseOriginalRecord.id.in_(set(record_ids))
+    ).all()
+
+    by_id = {record.id: record for record in records}
+    return [by_id.get(record_id) for record_id in record_ids]
+
 # get by tln
 def get_record_by_tln(db: Session, tln: str):
     
@@ -2,7 +2,7 @@ from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from app.models.record_suppression import RecordSuppressionRequest
 from app.schemas.record_suppression_schema import (
@@ -17,6 +17,9 @@ from app.crud.vehicle_registration_crud import create_master_record
 from app.crud.driving_license_crud import create_original_record
 from app.schemas.vehicle_registration_schema import MasterCreateRequest
 from app.schemas.driving_license_schema import DriverLicenseOriginalCreate as DriverLicenseCreateRequest
+from app.utils.fieldsets import load_only_option
+from app.utils.pagination import paginate
+from app.events import publish_change
 
 
 def suppress_record(
@@ -55,6 +58,7 @@ def suppress_record(
     record.is_suppressed = True
     db.commit()
     db.refresh(suppression)
+    publish_change("suppression", "suppressed", [suppression.id])
 
     return suppression
 
@@ -91,6 +95,7 @@ def revoke_suppression(
 
     db.commit()
     db.refresh(suppression)
+    publish_change("suppression", "revoked", [suppression.id])
 
     return suppression
 
@@ -118,12 +123,24 @@ def get_suppression_history(
     )
 
 
+# list response field -> column it is built from, used for fields= on the active list
+SUPPRESSION_LIST_COLUMNS = {
+    "suppression_id": "id",
+    "record_type": "record_type",
+    "record_id": "record_id",
+    "reason": "reason",
+    "suppressed_at": "suppressed_at",
+    "days_suppressed": "suppressed_at",
+}
+
+
 def get_active_suppressions(
     db: Session,
     record_type: Optional[str] = None,
     limit: int = 50,
-    offset: int = 0
-) -> ActiveSuppressionsListAllResponse:
+    offset: int = 0,
+    fields: Optional[List[str]] = None
+):
     
     query = db.query(RecordSuppressionRequest).filter(
         RecordSuppressionRequest.status == "active"
@@ -132,22 +149,30 @@ def get_active_suppressions(
     if record_type:
         query = query.filter(RecordSuppressionRequest.record_type == record_type)
 
-    total = query.count()
-    entries = query.order_by(
-        RecordSuppressionRequest.suppressed_at.desc()
-    ).offset(offset).limit(limit).all()
+    if fields:
+        columns = sorted({SUPPRESSION_LIST_COLUMNS[name] for name in fields})
+        query = query.options(load_only_option(RecordSuppressionRequest, columns))
+
+    # total comes back with the page via COUNT(*) OVER(), one scan instead of two
+    page = paginate(
+        query.order_by(RecordSuppressionRequest.suppressed_at.desc()),
+        offset, limit, "exact"
+    )
+    total = page.total
 
     suppressions = []
-    for entry in entries:
-        days_suppressed = (datetime.utcnow() - entry.suppressed_at.replace(tzinfo=None)).days
-        suppressions.append(ActiveSuppressionListResponse(
-            suppression_id=entry.id,
-            record_type=entry.record_type,
-            record_id=entry.record_id,
-            reason=entry.reason,
-            suppressed_at=entry.suppressed_at,
-            days_suppressed=days_suppressed
-        ))
+    for entry in page.items:
+        row = {"suppression_id": entry.id}
+        if not fields or "days_suppressed" in fields:
+            row["days_suppressed"] = (datetime.utcnow() - entry.suppressed_at.replace(tzinfo=None)).days
+        for name in (fields or SUPPRESSION_LIST_COLUMNS):
+            if name not in row:
+                row[name] = getattr(entry, SUPPRESSION_LIST_COLUMNS[name])
+        suppressions.append(row if fields else ActiveSuppressionListResponse(**row))
+
+    # sparse rows are plain dicts, the route sends them without response_model validation
+    if fields:
+        return {"total_active": total, "suppressions": suppressions}
 
     return ActiveSuppressionsListAllResponse(
         total_active=total,
@@ -278,6 +303,7 @@ def create_suppressed_vr_master(
         db.commit()
         db.refresh(vr_master)
         db.refresh(suppression)
+        publish_change("suppression", "suppressed", [suppression.id])
 
         return {
             "record": vr_master,
@@ -335,6 +361,7 @@ def create_suppressed_dl_original(
         db.commit()
         db.refresh(dl_record)
         db.refresh(suppression)
+        publish_change("suppression", "suppressed", [suppression.id])
 
         return {
             "record": dl_record,
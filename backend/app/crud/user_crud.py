@@ -1,8 +1,13 @@
+import base64
+from fastapi import HTTPException
+from sqlalchemy import delete, func, insert, or_, select
 from sqlalchemy.orm import Session
 from .. import models 
 from ..schemas import user_schema 
 # from app.utils.hash_password import hash_password
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+from app.cache_bus import invalidate
+from app.reference_data import get_reference_data
 
 def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
     return db.query(models.User).filter(models.User.email == email).first()
@@ -21,31 +26,107 @@ def create_user(db: Session, user: user_schema.UserCreate) -> models.User:
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    db.flush()
+
+    # Assign Role based on Email Pattern: exact matches and "%@domain" suffix rules,
+    # resolved against the cached mapping index instead of looping over every mapping
+    ref = get_reference_data(db)
+    role_ids = ref.email_roles.resolve(user.email)
 
-    # Assign Role based on Email Pattern
-    mappings = db.query(models.EmailRoleMapping).all()
-    assigned_role = None
-
-    for mapping in mappings:
-        pattern = mapping.email_pattern
-        # Handle exact match
-        if pattern == user.email:
-            db_user.roles.append(mapping.role)
-        # Handle simple suffix matching (e.g., "%@admin.com")
-        elif pattern.startswith("%"):
-            suffix = pattern[1:]
-            if user.email.lower().endswith(suffix.lower()):
-                db_user.roles.append(mapping.role)
-    
     # Default to 'User' role if no roles assigned
-    if not db_user.roles:
-        default_role = db.query(models.Role).filter(models.Role.name == "User").first()
-        if default_role:
-            db_user.roles.append(default_role)
-    
+    if not role_ids and "User" in ref.roles_by_name:
+        role_ids = (ref.roles_by_name["User"].id,)
+
+    # one insert for all the roles, committed together with the user
+    if role_ids:
+        db.execute(insert(models.user_roles_table), [
+            {"user_email": db_user.email, "role_id": role_id} for role_id in role_ids
+        ])
+
     db.commit()
     db.refresh(db_user)
 
     return db_user
+
+
+# replace the roles of many emails at once: existing users get their user_roles rows swapped,
+# emails without a user get their email_role_mappings swapped, a few set-based statements in total.
+# the caller commits
+def assign_roles_bulk(db: Session, assignments: Dict[str, List[int]]) -> Tuple[int, int]:
+    user_roles = models.user_roles_table
+    users = dict(db.execute(
+        select(models.User.email, models.User.id).where(models.User.email.in_(list(assignments)))
+    ).all())
+    pending = [email for email in assignments if email not in users]
+
+    if users:
+        db.execute(delete(user_roles).where(user_roles.c.user_email.in_(list(users))))
+        rows = [{"user_email": email, "role_id": role_id} for email in users for role_id in set(assignments[email])]
+        if rows:
+            db.execute(insert(user_roles), rows)
+        invalidate(db, "user_roles", list(users.values()))
+
+    if pending:
+        db.execute(delete(models.EmailRoleMapping).where(models.EmailRoleMapping.email_pattern.in_(pending)))
+        rows = [
+            {"email_pattern": email, "role_id": role_id, "description": f"Pre-assigned role for {email}"}
+            for email in pending for role_id in set(assignments[email])
+        ]
+        if rows:
+            db.execute(insert(models.EmailRoleMapping), rows)
+        invalidate(db, "email_role_mappings")
+
+    return len(users), len(pending)
+
+
+# keyset cursor over users.id, opaque to the client
+def encode_user_cursor(user_id: int) -> str:
+    return base64.urlsafe_b64encode(str(user_id).encode()).decode()
+
+def decode_user_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# one page of the admin user directory by id, with each user's role ids (one extra query for the page)
+def get_users_page(
+    db: Session,
+    limit: int = 25,
+    cursor: Optional[str] = None,
+    q: Optional[str] = None,
+    role_id: Optional[int] = None,
+    is_active: Optional[bool] = None
+) -> Tuple[List[Tuple[models.User, List[int]]], Optional[str]]:
+    query = db.query(models.User)
+    if q:
+        # prefix match on email / first / last name
+        escaped = q.strip().lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = f"{escaped}%"
+        query = query.filter(or_(
+            func.lower(models.User.email).like(pattern, escape="\\"),
+            func.lower(models.User.first_name).like(pattern, escape="\\"),
+            func.lower(models.User.last_name).like(pattern, escape="\\"),
+        ))
+    if role_id is not None:
+        query = query.filter(models.User.email.in_(
+            select(models.user_roles_table.c.user_email).where(models.user_roles_table.c.role_id == role_id)
+        ))
+    if is_active is not None:
+        query = query.filter(models.User.is_active == is_active)
+    if cursor:
+        query = query.filter(models.User.id > decode_user_cursor(cursor))
+
+    # one extra row tells us if there is a next page
+    users = query.order_by(models.User.id).limit(limit + 1).all()
+    next_cursor = encode_user_cursor(users[limit - 1].id) if len(users) > limit else None
+    users = users[:limit]
+
+    role_ids: Dict[str, List[int]] = {}
+    if users:
+        for email, rid in db.execute(
+            select(models.user_roles_table.c.user_email, models.user_roles_table.c.role_id)
+            .where(models.user_roles_table.c.user_email.in_([user.email for user in users]))
+        ):
+            role_ids.setdefault(email, []).append(rid)
+    return [(user, sorted(role_ids.get(user.email, []))) for user in users], next_cursor
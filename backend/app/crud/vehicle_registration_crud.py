@@ -1,5 +1,6 @@
 from fastapi import HTTPException
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, joinedload, noload, selectinload
 from typing import List, Optional
 from app.models import (
     VehicleRegistrationMaster,
@@ -25,6 +26,9 @@ from app.schemas.vehicle_registration_schema import(
     VehicleRegistrationUnderCoverTrapInfoCreateBody
 )
 from ..models.base import BaseModel
+from app.utils.fieldsets import load_only_option
+from app.utils.pagination import Page, TotalMode, paginate
+from app.events import publish_change
 
 #Create records
 
@@ -137,23 +141,31 @@ def create_fictitious_record(db, payload: FictitiousCreateRequest):
 def get_vehicle_by_id(db: Session, record_id: int):
     return db.query(VehicleRegistrationMaster).filter(VehicleRegistrationMaster.id== record_id).first()
 
+# decide which table to query based on record_type parameter
+def get_vehicle_model(record_type: Optional[str]):
+    if record_type == "undercover":
+        return VehicleRegistrationUnderCover
+    elif record_type == "fictitious":
+        return VehicleRegistrationFictitious
+    return VehicleRegistrationMaster  # default to master if no type specified
+
 #get all, this is for search bar
 def get_all_vehicles(db: Session,
                      skip:int= 0,
                      limit:int = 10,
                      approval_status: Optional[str] = None,
                      search: Optional[str] = None,
-                     record_type: Optional[str]= "master"):
-    # decide which table to query based on record_type parameter
-    if record_type == "undercover":
-        model = VehicleRegistrationUnderCover
-    elif record_type == "fictitious":
-        model = VehicleRegistrationFictitious
-    else:  # default to master if no type specified
-        model = VehicleRegistrationMaster
+                     record_type: Optional[str]= "master",
+                     fields: Optional[List[str]] = None,
+                     total_mode: TotalMode = "none") -> Page:
+    model = get_vehicle_model(record_type)
 
     query = db.query(model)
 
+    # only the requested columns; by default the large-text group stays deferred (the list rows don't carry it)
+    if fields:
+        query = query.options(load_only_option(model, fields))
+
     if approval_status:
         query = query.filter(VehicleRegistrationMaster.approval_status == approval_status)
 
@@ -162,7 +174,7 @@ def get_all_vehicles(db: Session,
 
     query = query.filter(model.is_suppressed == False) # exclude suppressed records
 
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, skip, limit, total_mode)
 
 # update
 def update_vehicle_record(db: Session, record_id: int, update_data: BaseModel, record_type: str = "master"):
@@ -212,6 +224,7 @@ def mark_inactive(db, record_id: int):
         ).update({"active_status": False}, synchronize_session=False)
 
         db.commit()
+        publish_change("vr_master", "inactive", [record_id])
         return record
     
     return None
@@ -233,26 +246,80 @@ def mark_active(db, record_id: int):
         ).update({"active_status": True}, synchronize_session=False)
 
         db.commit()
+        publish_change("vr_master", "active", [record_id])
         return record
     return None
 
-# function to get all the details for one vehicle
-def get_vehicle_master_details(db: Session, master_id: str):
+# relations that can be requested with include=, each entry takes the loader to use
+# (joinedload/selectinload) and returns the option. history is not a relationship,
+# it is fetched with its own query
+MASTER_INCLUDE_OPTIONS = {
+    "contacts": lambda load: load(VehicleRegistrationMaster.contacts),
+    "undercover": lambda load: load(VehicleRegistrationMaster.undercover_records)
+        .noload(VehicleRegistrationUnderCover.trap_info),
+    "undercover.trap_info": lambda load: load(VehicleRegistrationMaster.undercover_records)
+        .selectinload(VehicleRegistrationUnderCover.trap_info),
+    "fictitious": lambda load: load(VehicleRegistrationMaster.fictitious_records)
+        .noload(VehicleRegistrationFictitious.trap_info),
+    "fictitious.trap_info": lambda load: load(VehicleRegistrationMaster.fictitious_records)
+        .selectinload(VehicleRegistrationFictitious.trap_info),
+    "documents": lambda load: load(VehicleRegistrationMaster.documents),
+}
+MASTER_INCLUDE_KEYS = list(MASTER_INCLUDE_OPTIONS) + ["history"]
+
+# what the details endpoint loaded before include= existed
+DEFAULT_DETAILS_INCLUDE = {"contacts", "undercover", "undercover.trap_info", "fictitious", "fictitious.trap_info"}
+
+# validate include= values, "undercover.trap_info" implies "undercover"
+def parse_master_include(include: Optional[List[str]]) -> set:
+    requested = {part.strip() for part in (include or []) if part and part.strip()}
+    unknown = requested - set(MASTER_INCLUDE_KEYS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown include value(s): {', '.join(sorted(unknown))}. "
+                   f"Allowed: {', '.join(MASTER_INCLUDE_KEYS)}"
+        )
+    for key in list(requested):
+        if "." in key:
+            requested.add(key.split(".", 1)[0])
+    return requested
+
+def master_load_options(include: set, single: bool = False):
+    # skip the bare relation if its nested form is also requested, the nested option covers it
+    keys = [
+        key for key in include
+        if key in MASTER_INCLUDE_OPTIONS and f"{key}.trap_info" not in include
+    ]
+    # one master with one collection is a single round trip as a join, more collections
+    # would multiply the joined rows so those go through selectinload (one IN query each)
+    load = joinedload if single and len(keys) == 1 else selectinload
+    options = [MASTER_INCLUDE_OPTIONS[key](load) for key in keys]
+    options.append(noload("*"))  # anything not requested stays unloaded
+    return options
+
+# function to get all the details for one vehicle, only the requested relations are loaded
+def get_vehicle_master_details(db: Session, master_id: str, include: Optional[set] = None):
+    if include is None:
+        include = DEFAULT_DETAILS_INCLUDE
     query = (
         db.query(VehicleRegistrationMaster)
         .filter(VehicleRegistrationMaster.id == master_id)
-        .options(
-            joinedload(VehicleRegistrationMaster.contacts),
-            # joinedload(VehicleRegistrationMaster.reciprocal_issued),  # these two are removed for now since relations has been removed temporarily
-            # joinedload(VehicleRegistrationMaster.reciprocal_received),
-            joinedload(VehicleRegistrationMaster.undercover_records)
-            .subqueryload(VehicleRegistrationUnderCover.trap_info),
-            joinedload(VehicleRegistrationMaster.fictitious_records)
-            .subqueryload(VehicleRegistrationFictitious.trap_info)
-        )
+        .options(*master_load_options(include, single=True))
     )
     return query.first()
 
+# load many masters in one IN query, returned in request order with None for missing ids
+def get_masters_by_ids(db: Session, record_ids: List[int], include: Optional[set] = None):
+    records = (
+        db.query(VehicleRegistrationMaster)
+        .filter(VehicleRegistrationMaster.id.in_(set(record_ids)))
+        .options(*master_load_options(include or set()))
+        .all()
+    )
+    by_id = {record.id: record for record in records}
+    return [by_id.get(record_id) for record_id in record_ids]
+
 #helper function to validate master exists and return it
 def get_master_by_id(db: Session, master_id: str):
     master = db.query(VehicleRegistrationMaster).filter(
@@ -270,6 +337,34 @@ def get_all_masters_for_dropdown(db: Session):
         VehicleRegistrationMaster.registered_owner
     ).all()
 
+# cheap fingerprint of the dropdown snapshot, changes on insert/delete/update
+def get_masters_snapshot_version(db: Session) -> str:
+    count, max_id, last_update = db.query(
+        func.count(VehicleRegistrationMaster.id),
+        func.max(VehicleRegistrationMaster.id),
+        func.max(VehicleRegistrationMaster.updated_at)
+    ).one()
+    stamp = last_update.isoformat() if last_update else "0"
+    return f"{count}-{max_id or 0}-{stamp}"
+
+# prefix search over vin / plate / owner for the typeahead,
+# matches the upper(...) indexes on the master table
+def search_masters_typeahead(db: Session, q: str, limit: int):
+    escaped = q.strip().upper().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    pattern = f"{escaped}%"
+    return db.query(
+        VehicleRegistrationMaster.id,
+        VehicleRegistrationMaster.vehicle_id_number,
+        VehicleRegistrationMaster.license_number,
+        VehicleRegistrationMaster.registered_owner
+    ).filter(
+        or_(
+            func.upper(VehicleRegistrationMaster.vehicle_id_number).like(pattern, escape="\\"),
+            func.upper(VehicleRegistrationMaster.license_number).like(pattern, escape="\\"),
+            func.upper(VehicleRegistrationMaster.registered_owner).like(pattern, escape="\\")
+        )
+    ).order_by(VehicleRegistrationMaster.id).limit(limit).all()
+
 # get uc/fc for a master record
 
 def get_undercover_by_master(db: Session, master_id: str):
@@ -335,6 +430,8 @@ def bulk_approve(db: Session, record_ids: List[int]):
             synchronize_session=False
         )
         db.commit()
+        if updated_count:
+            publish_change("vr_master", "approved", record_ids)
         return updated_count
     except Exception as e:
         db.rollback()
@@ -351,6 +448,8 @@ def bulk_reject(db: Session, record_ids: List[int]):
             synchronize_session=False
         )
         db.commit()
+        if updated_count:
+            publish_change("vr_master", "rejected", record_ids)
         return updated_count
     except Exception as e:
         db.rollback()
@@ -367,6 +466,8 @@ def bulk_set_on_hold(db: Session, record_ids: List[int]):
             synchronize_session=False
         )
         db.commit()
+        if updated_count:
+            publish_change("vr_master", "on_hold", record_ids)
         return updated_count
     except Exception as e:
         db.rollback()
@@ -383,6 +484,8 @@ def bulk_active(db: Session, record_ids: List[int]):
             synchronize_session=False
         )
         db.commit()
+        if updated_count:
+            publish_change("vr_master", "active", record_ids)
         return updated_count
     except Exception as e:
         db.rollback()
@@ -399,6 +502,8 @@ def bulk_inactive(db: Session, record_ids: List[int]):
             synchronize_session=False
         )
         db.commit()
+        if updated_count:
+            publish_change("vr_master", "inactive", record_ids)
         return updated_count
     except Exception as e:
         db.rollback()
@@ -411,6 +516,8 @@ def bulk_delete(db: Session, record_ids: List[int]):
             VehicleRegistrationMaster.id.in_(record_ids)
         ).delete(synchronize_session=False)
         db.commit()
+        if deleted_count:
+            publish_change("vr_master", "deleted", record_ids)
         return deleted_count
     except Exception as e:
         db.rollback()
@@ -1,8 +1,15 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+from starlette.responses import Response
+from typing import Dict
+import hashlib
 import os
+import time
 from dotenv import load_dotenv
+from app.config import settings
+from app.admission import classify
 
 load_dotenv()
 
@@ -12,10 +19,124 @@ engine = create_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(autoflush=False, autocommit=False, bind=engine)
 
+# read replica, only used by routes that depend on get_read_db
+replica_engine = None
+ReplicaSessionLocal = None
+if settings.REPLICA_DATABASE_URL:
+    replica_engine = create_engine(settings.REPLICA_DATABASE_URL, pool_pre_ping=True)
+    if replica_engine.dialect.name == "postgresql":
+        replica_engine = replica_engine.execution_options(postgresql_readonly=True)
+    ReplicaSessionLocal = sessionmaker(autoflush=False, autocommit=False, bind=replica_engine)
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal() #create db session
+# read-your-writes: callers that just committed on the primary keep reading from it for a few seconds.
+# pinned by bearer token in this worker, and by cookie so other workers see it too
+PRIMARY_PIN_COOKIE = "pru_primary_until"
+_primary_pins: Dict[str, float] = {}
+
+
+# flag the request as soon as it commits, dependency teardown runs after the response is sent
+@event.listens_for(SessionLocal, "after_commit")
+def _mark_primary_write(session):
+    request = session.info.get("request")
+    if request is not None:
+        request.state.wrote_to_primary = True
+
+
+# per route statement_timeout and disconnect cancellation. every transaction a request opens
+# gets SET LOCAL statement_timeout for its route class, and its dbapi connection is registered on
+# request.state so the disconnect middleware (app/query_cancel.py) can cancel the running query
+def statement_timeout_for(request: Request) -> int:
+    path = request.scope.get("path", "")
+    for prefix, ms in settings.STATEMENT_TIMEOUT_OVERRIDES_MS.items():
+        if path.startswith(prefix):
+            return ms
+    return settings.STATEMENT_TIMEOUT_MS.get(classify(request.scope), 0)
+
+
+def _on_begin(session, transaction, connection):
+    request = session.info.get("request")
+    if request is None:
+        return
+    dbapi_conn = connection.connection.dbapi_connection
+    connections = getattr(request.state, "db_connections", None)
+    if connections is None:
+        connections = request.state.db_connections = []
+    if dbapi_conn not in connections:
+        connections.append(dbapi_conn)
+        session.info.setdefault("db_connections", []).append(dbapi_conn)
+    if connection.dialect.name == "postgresql":
+        timeout_ms = statement_timeout_for(request)
+        if timeout_ms:
+            connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+
+
+def _on_transaction_end(session, transaction):
+    # commit / rollback hands the connection back to the pool, where another request may pick it up;
+    # a later disconnect of this request must not cancel that request's statement
+    if transaction.parent is not None:
+        return
+    request = session.info.get("request")
+    released = session.info.pop("db_connections", [])
+    connections = getattr(request.state, "db_connections", None) if request is not None else None
+    if connections:
+        for dbapi_conn in released:
+            if dbapi_conn in connections:
+                connections.remove(dbapi_conn)
+
+
+event.listen(SessionLocal, "after_begin", _on_begin)
+event.listen(SessionLocal, "after_transaction_end", _on_transaction_end)
+if ReplicaSessionLocal is not None:
+    event.listen(ReplicaSessionLocal, "after_begin", _on_begin)
+    event.listen(ReplicaSessionLocal, "after_transaction_end", _on_transaction_end)
+
+
+def _caller_key(request: Request):
+    auth = request.headers.get("authorization")
+    return hashlib.sha256(auth.encode()).hexdigest() if auth else None
+
+
+def pin_to_primary(request: Request, response: Response):
+    until = time.time() + settings.READ_YOUR_WRITES_SECONDS
+    key = _caller_key(request)
+    if key:
+        if len(_primary_pins) > 10000:
+            now = time.time()
+            for k in [k for k, v in _primary_pins.items() if v < now]:
+                _primary_pins.pop(k, None)
+        _primary_pins[key] = until
+    response.set_cookie(
+        PRIMARY_PIN_COOKIE, str(int(until)),
+        max_age=settings.READ_YOUR_WRITES_SECONDS, httponly=True, samesite="lax"
+    )
+
+
+def is_pinned_to_primary(request: Request) -> bool:
+    now = time.time()
+    key = _caller_key(request)
+    if key and _primary_pins.get(key, 0) > now:
+        return True
+    try:
+        return int(request.cookies.get(PRIMARY_PIN_COOKIE, 0)) > now
+    except ValueError:
+        return False
+
+
+def get_db(request: Request):
+    db = SessionLocal(info={"request": request}) #create db session
+    try:
+        yield db
+    finally:
+        db.close()
+
+# session for read-only routes, replica unless there is none or the caller just wrote
+def get_read_db(request: Request):
+    if ReplicaSessionLocal is None or is_pinned_to_primary(request):
+        db = SessionLocal(info={"request": request})
+    else:
+        db = ReplicaSessionLocal(info={"request": request})
     try:
         yield db
     finally:
@@ -0,0 +1,101 @@
+import asyncio
+import itertools
+import json
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# live change feed for the dashboard and the review queues.
+# crud code publishes after commit (from the threadpool), the sse route fans events out per subscriber.
+# this is per worker process, each worker only sees changes committed through it.
+
+# roles that may see a topic, topics not listed go to every signed in user
+TOPIC_ROLES = {
+    "vr_master": ("Admin", "Supervisor / Manager", "User"),
+    "suppression": ("Admin", "Supervisor / Manager"),
+}
+
+COALESCE_SECONDS = 0.5  # bursts inside this window go out as one message
+HEARTBEAT_SECONDS = 15
+MAX_IDS_PER_EVENT = 500  # past this the ids are dropped and clients refetch the whole list
+MAX_PENDING = 200  # per subscriber, past this we send a single resync
+
+
+class Subscriber:
+    def __init__(self, roles: Iterable[str]):
+        self.roles: Set[str] = set(roles)
+        self.pending: Dict[Tuple[str, str], Optional[Set[int]]] = {}
+        self.overflowed = False
+        self.wakeup = asyncio.Event()
+
+    def can_see(self, topic: str) -> bool:
+        allowed = TOPIC_ROLES.get(topic)
+        return allowed is None or bool(self.roles.intersection(allowed))
+
+    def add(self, topic: str, action: str, ids: List[int]):
+        key = (topic, action)
+        if key not in self.pending and len(self.pending) >= MAX_PENDING:
+            self.overflowed = True
+        elif key in self.pending and self.pending[key] is None:
+            pass
+        else:
+            merged = self.pending.setdefault(key, set())
+            merged.update(ids)
+            if len(merged) > MAX_IDS_PER_EVENT:
+                self.pending[key] = None
+        self.wakeup.set()
+
+    def drain(self) -> List[dict]:
+        if self.overflowed:
+            events = [{"topic": "*", "action": "resync", "ids": None}]
+        else:
+            events = [
+                {"topic": topic, "action": action, "ids": sorted(ids) if ids is not None else None}
+                for (topic, action), ids in self.pending.items()
+            ]
+        self.pending = {}
+        self.overflowed = False
+        self.wakeup.clear()
+        return events
+
+
+class EventBroker:
+    def __init__(self):
+        self._subscribers: Set[Subscriber] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ids = itertools.count(1)
+
+    def subscribe(self, roles: Iterable[str]) -> Subscriber:
+        self._loop = asyncio.get_running_loop()
+        subscriber = Subscriber(roles)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+
+    # safe to call from sync route code, nothing happens when nobody is listening
+    def publish(self, topic: str, action: str, ids: Iterable[int]):
+        if not self._subscribers or self._loop is None:
+            return
+        ids = [int(i) for i in ids]
+        try:
+            self._loop.call_soon_threadsafe(self._dispatch, topic, action, ids)
+        except RuntimeError:
+            # loop already closed (shutdown)
+            pass
+
+    def _dispatch(self, topic: str, action: str, ids: List[int]):
+        for subscriber in list(self._subscribers):
+            if subscriber.can_see(topic):
+                subscriber.add(topic, action, ids)
+
+    def format(self, events: List[dict]) -> str:
+        payload = json.dumps({"events": events, "sent_at": datetime.now(timezone.utc).isoformat()})
+        return f"id: {next(self._ids)}\nevent: changes\ndata: {payload}\n\n"
+
+
+broker = EventBroker()
+
+
+def publish_change(topic: str, action: str, ids: Iterable[int]):
+    broker.publish(topic, action, ids)
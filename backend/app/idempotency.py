@@ -0,0 +1,216 @@
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.idempotency import IdempotencyKey
+
+# Idempotency-Key support. a POST/PUT/PATCH/DELETE sent with the header runs once per caller and key;
+# retries with the same key get the stored response back (Idempotent-Replayed: true) without
+# running the handler again. 5xx responses are not stored so the client can retry them.
+
+logger = logging.getLogger(__name__)
+
+HEADER = b"idempotency-key"
+UNSAFE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+MAX_KEY_LENGTH = 255
+IN_PROGRESS_TIMEOUT = timedelta(minutes=5)  # a claim older than this is treated as abandoned
+
+
+def _aware(value: datetime) -> datetime:
+    # sqlite hands back naive datetimes
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _claim(caller: str, key: str, request_hash: str):
+    db = SessionLocal()
+    try:
+        now = datetime.now(timezone.utc)
+        for _ in range(2):
+            existing = db.query(IdempotencyKey).filter(
+                IdempotencyKey.caller == caller,
+                IdempotencyKey.key == key
+            ).first()
+            if existing is not None:
+                stale = _aware(existing.expires_at) <= now or (
+                    existing.status == "in_progress" and _aware(existing.created_at) <= now - IN_PROGRESS_TIMEOUT
+                )
+                if not stale:
+                    return {
+                        "status": existing.status,
+                        "request_hash": existing.request_hash,
+                        "response_status": existing.response_status,
+                        "response_content_type": existing.response_content_type,
+                        "response_body": existing.response_body,
+                    }
+                db.delete(existing)
+                db.flush()
+
+            db.add(IdempotencyKey(
+                caller=caller,
+                key=key,
+                request_hash=request_hash,
+                status="in_progress",
+                created_at=now,
+                expires_at=now + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS)
+            ))
+            try:
+                db.commit()
+                return None
+            except IntegrityError:
+                # another worker claimed it first, read theirs
+                db.rollback()
+        return {"status": "in_progress", "request_hash": request_hash}
+    finally:
+        db.close()
+
+
+def _complete(caller: str, key: str, status: int, content_type: str, body: bytes):
+    db = SessionLocal()
+    try:
+        row = db.query(IdempotencyKey).filter(
+            IdempotencyKey.caller == caller,
+            IdempotencyKey.key == key
+        ).first()
+        if row is None:
+            return
+        if status >= 500:
+            db.delete(row)
+        else:
+            row.status = "completed"
+            row.response_status = status
+            row.response_content_type = content_type
+            row.response_body = body
+        db.commit()
+    finally:
+        db.close()
+
+
+def delete_expired_keys() -> int:
+    db = SessionLocal()
+    try:
+        deleted = db.query(IdempotencyKey).filter(
+            IdempotencyKey.expires_at < datetime.now(timezone.utc)
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+
+async def sweep_expired_keys():
+    while True:
+        await asyncio.sleep(settings.IDEMPOTENCY_SWEEP_SECONDS)
+        try:
+            await run_in_threadpool(delete_expired_keys)
+        except Exception:
+            logger.exception("idempotency key sweep failed")
+
+
+async def _send_json(send, status: int, detail: str, extra_headers=()):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *extra_headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in UNSAFE_METHODS:
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        raw_key = headers.get(HEADER)
+        if raw_key is None:
+            return await self.app(scope, receive, send)
+
+        key = raw_key.decode("latin-1").strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return await _send_json(send, 400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+
+        auth = headers.get(b"authorization")
+        client = scope.get("client")
+        caller = hashlib.sha256(auth or (client[0] if client else "anonymous").encode()).hexdigest()
+
+        # fingerprint of the request, the same key with a different request is a client bug.
+        # json bodies are hashed in full; uploads only by size so files are not buffered here
+        fingerprint = hashlib.sha256()
+        fingerprint.update(f"{scope['method']} {scope['path']}?{scope.get('query_string', b'').decode('latin-1')}".encode())
+        content_type = headers.get(b"content-type", b"")
+        content_length = headers.get(b"content-length", b"")
+        fingerprint.update(content_type.split(b";")[0] + b"|" + content_length)
+
+        buffered = []
+        if not content_type.startswith(b"multipart/") and (
+            not content_length.isdigit() or int(content_length) <= settings.IDEMPOTENCY_MAX_BODY_BYTES
+        ):
+            while True:
+                message = await receive()
+                buffered.append(message)
+                if message["type"] != "http.request":
+                    break
+                fingerprint.update(message.get("body", b""))
+                if not message.get("more_body", False):
+                    break
+        request_hash = fingerprint.hexdigest()
+
+        existing = await run_in_threadpool(_claim, caller, key, request_hash)
+        if existing is not None:
+            if existing["request_hash"] != request_hash:
+                return await _send_json(send, 422, "Idempotency-Key was already used for a different request")
+            if existing["status"] != "completed":
+                return await _send_json(
+                    send, 409, "A request with this Idempotency-Key is still being processed",
+                    [(b"retry-after", b"1")]
+                )
+            body = existing["response_body"] or b""
+            await send({
+                "type": "http.response.start",
+                "status": existing["response_status"],
+                "headers": [
+                    (b"content-type", (existing["response_content_type"] or "application/json").encode()),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"idempotent-replayed", b"true"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def replay_receive():
+            if buffered:
+                return buffered.pop(0)
+            return await receive()
+
+        response = {"status": 500, "content_type": "", "body": []}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type":
+                        response["content_type"] = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        finally:
+            await run_in_threadpool(
+                _complete, caller, key, response["status"], response["content_type"], b"".join(response["body"])
+            )
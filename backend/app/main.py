@@ -1,7 +1,10 @@
-from fastapi import APIRouter, FastAPI, Depends
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, pin_to_primary
 from app.models import VehicleRegistrationMaster
 from app.api.routes import vehicle_registration_routes
 from app.api.routes import action_routes
@@ -15,10 +18,48 @@ from app.api.routes import driving_license_routes
 from app.security import get_current_user
 from app.api.routes import record_suppression_routes
 from app.api.routes import admin_routes
+from app.api.routes import event_routes
 from app.models import user_models
-
-
-app = FastAPI()
+from app.cache_bus import listener as cache_invalidation_listener
+from app.admission import AdmissionControlMiddleware, admission_stats
+from app.query_cancel import CancelOnDisconnectMiddleware
+from app.idempotency import IdempotencyMiddleware, sweep_expired_keys
+from app.audit import writer as audit_writer
+from app.crud.document_link_crud import auto_link_loop
+from app import previews, reference_data
+from app.config import settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # cross-worker cache invalidation (postgres LISTEN, no-op on sqlite)
+    cache_invalidation_listener.start()
+    # load action types / roles / permissions / modules before the first request needs them
+    reference_data.warm()
+    # drop expired Idempotency-Key rows
+    idempotency_sweeper = asyncio.create_task(sweep_expired_keys())
+    # propose record links for newly OCR'd documents
+    auto_linker = asyncio.create_task(auto_link_loop()) if settings.AUTO_LINK_INTERVAL_SECONDS else None
+    yield
+    idempotency_sweeper.cancel()
+    if auto_linker:
+        auto_linker.cancel()
+    cache_invalidation_listener.stop()
+    # flush buffered audit rows (AUDIT_MODE=buffered)
+    audit_writer.stop()
+    previews.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# per route class concurrency limits, sits inside cors so shed responses are still readable by the FE
+app.add_middleware(AdmissionControlMiddleware)
+
+# cancel the running query when a GET client disconnects, frees the db and the pooled connection
+app.add_middleware(CancelOnDisconnectMiddleware)
+
+# Idempotency-Key replay for retried posts (creates, actions, uploads)
+app.add_middleware(IdempotencyMiddleware)
 
 # adding cors for FE connection
 app.add_middleware(
@@ -33,8 +74,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Total-Count-Estimated"],
 )
 
+# compress larger json payloads (dropdown snapshot, list pages)
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+
+# read-your-writes, a request that committed on the primary pins the caller to it for a short window
+@app.middleware("http")
+async def pin_writers_to_primary(request: Request, call_next):
+    response = await call_next(request)
+    if getattr(request.state, "wrote_to_primary", False):
+        pin_to_primary(request, response)
+    return response
+
 router = APIRouter(prefix="/api", dependencies=[Depends(get_current_user)])
 
 
@@ -48,12 +102,19 @@ async def health():
     return {"status": 200, "message": "Server Running"}
 
 
+# queue depth and shed counts for the admission limiter in this worker
+@app.get("/health/admission")
+async def admission_metrics():
+    return admission_stats()
+
+
 router.include_router(document_routes.router)
 router.include_router(vehicle_registration_routes.router)
 router.include_router(driving_license_routes.router)
 router.include_router(action_routes.router)
 router.include_router(dashboard_routes.router)
 router.include_router(record_suppression_routes.router)
+router.include_router(event_routes.router)
 
 app.include_router(router)
 
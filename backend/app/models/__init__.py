@@ -12,10 +12,12 @@ from .vehicle_registration import (
 
 from .user_models import user_roles_table, User, Role, EmailRoleMapping, Module, Permission
 
-from .document_library import DocumentLibrary, DocumentAuditLog
+from .document_library import DocumentLibrary, DocumentAuditLog, DocumentRecordLink, DocumentScrubFinding, DocumentScrubCheckpoint
 
 from .driving_license import (DriverLicenseOriginalRecord, DriverLicenseContact, DriverLicenseFictitiousTrap)
 
+from .idempotency import IdempotencyKey
+
 # export all models for easy importing
 __all__ = [
     "Base",
@@ -38,7 +40,11 @@ __all__ = [
     "user_roles_table",
     "DocumentLibrary",
     "DocumentAuditLog",
+    "DocumentRecordLink",
+    "DocumentScrubFinding",
+    "DocumentScrubCheckpoint",
     "DriverLicenseOriginalRecord",
     "DriverLicenseContact",
-    "DriverLicenseFictitiousTrap"
+    "DriverLicenseFictitiousTrap",
+    "IdempotencyKey"
 ]
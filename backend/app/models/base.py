@@ -4,6 +4,9 @@ from sqlalchemy.orm import relationship
 
 from app.database import Base
 
+# deferred group for big Text/JSON columns, list queries skip these unless asked for
+LARGE_TEXT_GROUP = "large_text"
+
 # base model with common fields for all tables
 class BaseModel(Base):
     __abstract__ = True  # wont create table
@@ -34,4 +37,6 @@ class RecordActionLog(Base):
     user_id = Column(String(100), nullable=False)
     ip_address = Column(String(50), nullable=True)
     timestamp = Column(DateTime(timezone=True), default=func.now())
-    notes = Column(Text, nullable=True)
\ No newline at end of file
+    notes = Column(Text, nullable=True)
+
+    action_type = relationship("ActionType")
\ No newline at end of file
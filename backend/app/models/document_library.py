@@ -1,7 +1,27 @@
-from sqlalchemy import Boolean, Column, Integer, String, Float, DateTime, ForeignKey, JSON, func
-from sqlalchemy.orm import relationship
+from sqlalchemy import DDL, Boolean, Column, Integer, String, Float, DateTime, ForeignKey, Index, JSON, Text, UniqueConstraint, event, func, literal
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from datetime import datetime
-from .base import Base
+from .base import Base, LARGE_TEXT_GROUP
+
+# jsonb on postgres (gin/expression indexes below), plain json elsewhere.
+# existing postgres databases: ALTER TABLE document_library ALTER COLUMN ocr_response_json TYPE jsonb USING ocr_response_json::jsonb
+OcrJSON = JSON().with_variant(JSONB(), "postgresql")
+
+# full-text search: a tsvector column on postgres (kept up to date by refresh_document_search),
+# an fts5 table (document_library_fts) on sqlite
+SearchVector = Text().with_variant(TSVECTOR(), "postgresql")
+
+def ocr_field(column, name: str):
+    # upper(ocr_response_json #>> '{fields,<name>}'), same expression as the indexes so lookups can use them
+    return func.upper(column[("fields", name)].as_string())
+
+# rows older than the not null change may have no created_at, they sort as this (last on the newest first list)
+CREATED_AT_FLOOR = datetime(1970, 1, 1)
+
+def created_sort_key(column):
+    # coalesce(created_at, '1970-01-01 00:00:00'), rendered inline so queries match the expression indexes
+    return func.coalesce(column, literal(CREATED_AT_FLOOR, DateTime, literal_execute=True))
 
 class DocumentLibrary(Base):
     __tablename__ = "document_library"
@@ -14,13 +34,20 @@ class DocumentLibrary(Base):
     status = Column(String, default="pending")
     content_type = Column(String, default="Document")
     abbyy_batch_id = Column(String, nullable=True)
-    ocr_response_json = Column(JSON, nullable=True)
+    ocr_response_json = deferred(Column(OcrJSON, nullable=True), group=LARGE_TEXT_GROUP)
     created_by = Column(Integer, nullable=True)
-    created_at = Column(DateTime, default=func.now())
+    # not null for new rows, the list's keyset cursor is (created_sort_key(created_at), id)
+    created_at = Column(DateTime, default=func.now(), server_default=func.now(), nullable=False)
     master_record_id = Column(Integer, ForeignKey("vehicle_registration_master.id"), nullable=True)
     is_archived = Column(Boolean, default=False)
     created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
     modified_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    links_proposed_at = Column(DateTime, nullable=True)  # set by the auto-link pipeline, cleared when OCR reruns
+    search_vector = deferred(Column(SearchVector, nullable=True), group="search")
+    content_hash = Column(String(64), nullable=True)  # sha256 of the original file, checked by the integrity scrubber
+    storage_tier = Column(String(10), nullable=False, default="hot", server_default="hot")  # hot, cold
+    compression = Column(String(10), nullable=True)  # zstd / gzip, cold files only
+    stored_size = Column(Float, nullable=True)  # kb on disk after compression
 
 
     #relationship
@@ -28,6 +55,59 @@ class DocumentLibrary(Base):
     modifier = relationship("User", foreign_keys=[modified_by])
     master_record = relationship("VehicleRegistrationMaster", backref="documents")
 
+    # keyset listing (newest first, on created_sort_key) with and without a type filter, and per master record.
+    # ocr results: gin (jsonb_path_ops) for @> containment, expression indexes for plate / vin lookups,
+    # gin over search_vector for full-text search
+    __table_args__ = (
+        Index("ix_document_library_archived_type_created", "is_archived", "document_type", created_sort_key(created_at), "id"),
+        Index("ix_document_library_archived_created", "is_archived", created_sort_key(created_at), "id"),
+        Index("ix_document_library_master_created", "master_record_id", created_sort_key(created_at)),
+        Index("ix_document_library_url", "document_url"),
+        Index("ix_document_library_tier_created", "storage_tier", "created_at"),
+        Index("ix_document_library_ocr_gin", ocr_response_json.columns[0],
+              postgresql_using="gin", postgresql_ops={"ocr_response_json": "jsonb_path_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_document_library_ocr_plate", ocr_field(ocr_response_json.columns[0], "plate")),
+        Index("ix_document_library_ocr_vin", ocr_field(ocr_response_json.columns[0], "vin")),
+        Index("ix_document_library_search", search_vector.columns[0], postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
+
+event.listen(
+    DocumentLibrary.__table__, "after_create",
+    DDL(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS document_library_fts "
+        "USING fts5(doc_id UNINDEXED, name, body, notes, tokenize='porter unicode61')"
+    ).execute_if(dialect="sqlite")
+)
+
+# integrity scrubber (app/utils/scrub_documents.py): what it found, and where it got to
+class DocumentScrubFinding(Base):
+    __tablename__ = "document_scrub_finding"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("document_library.id"), nullable=True)  # null for orphan files
+    document_url = Column(String, nullable=False)
+    kind = Column(String(20), nullable=False)  # missing, mismatch, unreadable, orphan
+    expected_hash = Column(String(64), nullable=True)
+    actual_hash = Column(String(64), nullable=True)
+    detail = Column(String, nullable=True)
+    found_at = Column(DateTime, default=func.now())
+
+    __table_args__ = (
+        Index("ix_document_scrub_finding_kind_found", "kind", "found_at"),
+    )
+
+class DocumentScrubCheckpoint(Base):
+    __tablename__ = "document_scrub_checkpoint"
+
+    id = Column(Integer, primary_key=True)
+    phase = Column(String(20), nullable=False, default="documents")  # documents, orphans, done
+    last_document_id = Column(Integer, nullable=False, default=0)
+    orphan_backend = Column(String(20), nullable=True)
+    last_orphan_key = Column(String, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
 class DocumentAuditLog(Base):
     __tablename__ = "document_audit_log"
 
@@ -41,3 +121,26 @@ class DocumentAuditLog(Base):
 
 
     document = relationship("DocumentLibrary", backref="audit_logs")
+
+
+# record links proposed by the OCR auto-link pipeline, confirmed or rejected by a reviewer
+class DocumentRecordLink(Base):
+    __tablename__ = "document_record_link"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("document_library.id"), nullable=False, index=True)
+    record_type = Column(String(10), nullable=False)  # vr, dl
+    record_id = Column(Integer, nullable=False)
+    confidence = Column(Float, nullable=False)  # 0..1
+    matched_on = Column(String(100), nullable=True)  # e.g. "vin,plate"
+    status = Column(String(20), nullable=False, default="proposed")  # proposed, accepted, rejected
+    created_at = Column(DateTime, default=func.now())
+    reviewed_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    reviewed_at = Column(DateTime, nullable=True)
+
+    document = relationship("DocumentLibrary", backref="record_links")
+
+    __table_args__ = (
+        UniqueConstraint("document_id", "record_type", "record_id", name="uq_document_record_link"),
+        Index("ix_document_record_link_status_confidence", "status", "confidence"),
+    )
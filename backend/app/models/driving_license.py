@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Numeric, Date
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Numeric, Date, Index, func
 from sqlalchemy.orm import relationship
 from .base import Base, BaseModel
 
@@ -26,6 +26,12 @@ class DriverLicenseOriginalRecord(BaseModel):
     contacts = relationship("DriverLicenseContact", back_populates="original_record")
     fictitious_traps = relationship("DriverLicenseFictitiousTrap", back_populates="original_record")
 
+    # for the OCR auto-linker, which matches upper(tdl) / upper(fdl) IN (...) per batch
+    __table_args__ = (
+        Index("ix_dl_upper_tdl", func.upper(tdl)),
+        Index("ix_dl_upper_fdl", func.upper(fdl)),
+    )
+
 
 # dl contact
 class DriverLicenseContact(BaseModel):
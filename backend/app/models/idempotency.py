@@ -0,0 +1,23 @@
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String, UniqueConstraint, func
+from .base import Base
+
+# stored responses for requests sent with an Idempotency-Key header, swept after they expire
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True)
+    caller = Column(String(64), nullable=False)  # hash of the bearer token, keys are per caller
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status = Column(String(20), nullable=False, default="in_progress")  # in_progress, completed
+
+    response_status = Column(Integer, nullable=True)
+    response_content_type = Column(String(100), nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint("caller", "key", name="uq_idempotency_caller_key"),
+    )
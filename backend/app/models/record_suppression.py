@@ -1,6 +1,7 @@
 from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text
+from sqlalchemy.orm import deferred
 from datetime import datetime
-from .base import BaseModel
+from .base import BaseModel, LARGE_TEXT_GROUP
 
 # audit trail for tracking suppression reqs
 class RecordSuppressionRequest(BaseModel):
@@ -20,7 +21,7 @@ class RecordSuppressionRequest(BaseModel):
     
     revoked_at = Column(DateTime(timezone=True), nullable=True)
     
-    revoke_reason = Column(Text, nullable=True)
+    revoke_reason = deferred(Column(Text, nullable=True), group=LARGE_TEXT_GROUP)
     
     def __repr__(self):
         return (
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Numeric, Date
-from sqlalchemy.orm import relationship
-from .base import BaseModel
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Numeric, Date, Index, func
+from sqlalchemy.orm import deferred, relationship
+from .base import BaseModel, LARGE_TEXT_GROUP
 
 
 class VehicleRegistrationMaster(BaseModel):
@@ -11,7 +11,7 @@ class VehicleRegistrationMaster(BaseModel):
     exempted_license_plate = Column(String(50))
     vehicle_id_number = Column(String(20), index=True)
     registered_owner = Column(String(200))
-    address = Column(Text)
+    address = deferred(Column(Text), group=LARGE_TEXT_GROUP)
     city = Column(String(100))
     state = Column(String(50), default="California")
     zip_code = Column(String(10))
@@ -41,8 +41,8 @@ class VehicleRegistrationMaster(BaseModel):
     approval_status = Column(String(20), default="pending")
     active_status = Column(Boolean, default=True)
     record_type = Column(String(20), default="master", nullable=True)
-    description = Column(Text)
-    error_text = Column(Text)
+    description = deferred(Column(Text), group=LARGE_TEXT_GROUP)
+    error_text = deferred(Column(Text), group=LARGE_TEXT_GROUP)
     link_to_folder = Column(String(500))
     document_id = Column(Integer)
  
@@ -61,6 +61,17 @@ class VehicleRegistrationMaster(BaseModel):
     reciprocal_received = relationship("VehicleRegistrationReciprocalReceived", back_populates="master_record", cascade="save-update, merge", passive_deletes=True,)
     undercover_records = relationship("VehicleRegistrationUnderCover", back_populates="master_record", cascade="all, delete-orphan")
     fictitious_records = relationship("VehicleRegistrationFictitious", back_populates="master_record", cascade="all, delete-orphan")
+
+    # prefix indexes for the masters typeahead (upper(col) LIKE 'ABC%'),
+    # text_pattern_ops lets postgres use them whatever the db collation is
+    __table_args__ = (
+        Index("ix_vrm_upper_vin_prefix", func.upper(vehicle_id_number).label("upper_vin"),
+              postgresql_ops={"upper_vin": "text_pattern_ops"}),
+        Index("ix_vrm_upper_plate_prefix", func.upper(license_number).label("upper_plate"),
+              postgresql_ops={"upper_plate": "text_pattern_ops"}),
+        Index("ix_vrm_upper_owner_prefix", func.upper(registered_owner).label("upper_owner"),
+              postgresql_ops={"upper_owner": "text_pattern_ops"}),
+    )
  
  
 class VehicleRegistrationUnderCover(BaseModel):
@@ -73,7 +84,7 @@ class VehicleRegistrationUnderCover(BaseModel):
     vehicle_id_number = Column(String(17), index=True)
     registered_owner = Column(String(200), nullable=False)
  
-    address = Column(Text)
+    address = deferred(Column(Text), group=LARGE_TEXT_GROUP)
     city = Column(String(100))
     state = Column(String(50), default="California")
     zip_code = Column(String(10))
@@ -111,8 +122,8 @@ class VehicleRegistrationUnderCover(BaseModel):
     sticker_numbers = Column(String(100))
  
     active_status = Column(Boolean, default=True)
-    error_text = Column(Text)
-    description = Column(Text)
+    error_text = deferred(Column(Text), group=LARGE_TEXT_GROUP)
+    description = deferred(Column(Text), group=LARGE_TEXT_GROUP)
 
     is_suppressed = Column(Boolean, default=False, index=True)
  
@@ -130,7 +141,7 @@ class VehicleRegistrationFictitious(BaseModel):
     vehicle_id_number = Column(String(17), index=True)
     registered_owner = Column(String(200), nullable=False)
  
-    address = Column(Text)
+    address = deferred(Column(Text), group=LARGE_TEXT_GROUP)
     city = Column(String(100))
     state = Column(String(50), default="California")
     zip_code = Column(String(10))
@@ -165,8 +176,8 @@ class VehicleRegistrationFictitious(BaseModel):
     link_to_folder = Column(Text)
  
     active_status = Column(Boolean, default=True)
-    error_text = Column(Text)
-    description = Column(Text)
+    error_text = deferred(Column(Text), group=LARGE_TEXT_GROUP)
+    description = deferred(Column(Text), group=LARGE_TEXT_GROUP)
 
     is_suppressed = Column(Boolean, default=False, index=True)                        
  
@@ -0,0 +1,155 @@
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
+from typing import List, Optional
+
+from app.config import settings
+from app.storage import open_document
+
+# first-page thumbnails and low-res page images for the review screen.
+# rendering runs in a process pool (started on first use, spawned so it doesn't inherit the api's threads);
+# uploads queue a render, GET /documents/{id}/preview renders on demand if it isn't there yet.
+# renders are cached on disk by content hash, so the same file is only rendered once whatever its id or tier.
+# needs Pillow, plus pypdfium2 for pdfs (both in requirements.txt); without them there are simply no previews.
+# scheduling is best effort: a failed or crashed pool never fails the upload, a broken pool is rebuilt.
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = {"thumb": settings.PREVIEW_THUMB_PX, "page": settings.PREVIEW_PAGE_PX}
+MEDIA_TYPES = {"webp": "image/webp", "png": "image/png"}
+
+
+def preview_path(content_hash: str, variant: str, page: int = 1) -> str:
+    name = f"{content_hash}_thumb.{settings.PREVIEW_FORMAT}" if variant == "thumb" \
+        else f"{content_hash}_page{page}.{settings.PREVIEW_FORMAT}"
+    return os.path.join(settings.PREVIEW_CACHE_DIR, content_hash[:2], name)
+
+
+def _page_images(data: bytes, max_pages: int):
+    try:
+        from PIL import Image
+    except ImportError:
+        raise RuntimeError("previews need Pillow installed")
+
+    if data[:5] == b"%PDF-":
+        try:
+            import pypdfium2
+        except ImportError:
+            raise RuntimeError("pdf previews need pypdfium2 installed")
+        pdf = pypdfium2.PdfDocument(data)
+        try:
+            for index in range(min(len(pdf), max_pages)):
+                # ~100 dpi is plenty for a page image the size of VARIANTS["page"]
+                yield pdf[index].render(scale=100 / 72).to_pil()
+        finally:
+            pdf.close()
+        return
+
+    image = Image.open(io.BytesIO(data))
+    # multi-page tiffs have one frame per page
+    for index in range(min(getattr(image, "n_frames", 1), max_pages)):
+        image.seek(index)
+        yield image.copy()
+
+
+def render_previews(document_url: str, compression: Optional[str], content_hash: str) -> List[str]:
+    # runs in a pool process, returns the files written
+    thumb = preview_path(content_hash, "thumb")
+    if os.path.exists(thumb):
+        return [thumb]
+    with closing(open_document(document_url, compression)) as source:
+        data = source.read()
+
+    os.makedirs(os.path.dirname(thumb), exist_ok=True)
+    image_format = "WEBP" if settings.PREVIEW_FORMAT == "webp" else "PNG"
+    written = []
+    for number, image in enumerate(_page_images(data, settings.PREVIEW_MAX_PAGES), start=1):
+        image = image.convert("RGB")
+        targets = [("page", preview_path(content_hash, "page", number))]
+        if number == 1:
+            targets.append(("thumb", thumb))
+        for variant, path in targets:
+            copy = image.copy()
+            copy.thumbnail((VARIANTS[variant], VARIANTS[variant]))
+            # write then rename, a reader never sees half a file
+            tmp = f"{path}.{os.getpid()}.tmp"
+            copy.save(tmp, image_format, quality=80)
+            os.replace(tmp, path)
+            written.append(path)
+    return written
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_pending = {}  # content_hash -> Future, so concurrent requests share one render
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PREVIEW_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _reset_pool(broken: ProcessPoolExecutor):
+    # a worker died (segfault in a decoder, oom kill) and the executor refuses all further work.
+    # it has already torn its processes down, drop it so the next submit starts a new one
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+
+
+def _submit(document_url: str, compression: Optional[str], content_hash: str):
+    pool = _get_pool()
+    try:
+        return pool, pool.submit(render_previews, document_url, compression, content_hash)
+    except BrokenProcessPool:
+        _reset_pool(pool)
+        pool = _get_pool()
+        return pool, pool.submit(render_previews, document_url, compression, content_hash)
+
+
+def schedule_preview(document_url: str, compression: Optional[str], content_hash: Optional[str]) -> Optional[Future]:
+    # never raises, callers are upload paths whose document is already committed
+    if not settings.PREVIEWS_ENABLED or not content_hash:
+        return None
+    with _pool_lock:
+        future = _pending.get(content_hash)
+        if future is not None:
+            return future
+    try:
+        pool, future = _submit(document_url, compression, content_hash)
+    except Exception:
+        logger.warning("could not schedule preview for %s", document_url, exc_info=True)
+        return None
+    with _pool_lock:
+        _pending[content_hash] = future
+
+    def _done(f: Future):
+        with _pool_lock:
+            _pending.pop(content_hash, None)
+        error = None if f.cancelled() else f.exception()
+        if isinstance(error, BrokenProcessPool):
+            _reset_pool(pool)
+        if error is not None:
+            logger.warning("preview for %s failed: %s", document_url, error)
+
+    future.add_done_callback(_done)
+    return future
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
@@ -0,0 +1,60 @@
+import asyncio
+
+# stop abandoned queries. for GET requests we watch the connection for http.disconnect while the
+# handler runs; when the client goes away, every db connection the request has open (registered on
+# request.state by the session hook in app/database.py) gets its running statement cancelled.
+# the handler then fails fast and its pooled connection goes back to the pool.
+
+# streaming responses do their own disconnect handling
+SKIP_PATHS = ("/api/events/stream",)
+
+
+def cancel_request_queries(state: dict):
+    # only connections inside an open transaction are listed, app/database.py drops them on commit/rollback
+    for dbapi_conn in list(state.get("db_connections", [])):
+        try:
+            if hasattr(dbapi_conn, "cancel"):
+                dbapi_conn.cancel()  # psycopg2, sends a cancel request for the running statement
+            elif hasattr(dbapi_conn, "interrupt"):
+                dbapi_conn.interrupt()  # sqlite3
+        except Exception:
+            pass
+
+
+class CancelOnDisconnectMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD") or scope["path"].startswith(SKIP_PATHS):
+            return await self.app(scope, receive, send)
+
+        state = scope.setdefault("state", {})
+        inbox: asyncio.Queue = asyncio.Queue()
+        response_done = False
+
+        # sole reader of the real receive channel, the app reads from the inbox instead
+        async def watch():
+            while True:
+                message = await receive()
+                await inbox.put(message)
+                if message["type"] == "http.disconnect":
+                    if not response_done:
+                        cancel_request_queries(state)
+                    return
+
+        async def app_receive():
+            return await inbox.get()
+
+        async def app_send(message):
+            nonlocal response_done
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_done = True
+            await send(message)
+
+        watcher = asyncio.create_task(watch())
+        try:
+            await self.app(scope, app_receive, app_send)
+        finally:
+            response_done = True
+            watcher.cancel()
@@ -1,21 +1,16 @@
 from fastapi import Depends, HTTPException, status
 from app.models import user_models
 from app.security import get_current_user
+from app.reference_data import get_permission_matrix
 
 class PermissionChecker:
     def __init__(self, permission_name: str):
         self.permission_name = permission_name
 
     def __call__(self, current_user: user_models.User = Depends(get_current_user)) -> user_models.User:
-        # Check if user has the required permission through any of their roles
-        has_perm = False
-        for role in current_user.roles:
-            for permission in role.permissions:
-                if permission.permission_name == self.permission_name:
-                    has_perm = True
-                    break
-            if has_perm:
-                break
+        # Check if user has the required permission through any of their roles,
+        # role -> permission names come from the cached permission matrix instead of lazy loads
+        has_perm = self.permission_name in get_permission_matrix(role.id for role in current_user.roles).permission_names
         
         # Admin role bypass (optional, but good for "superuser" access)
         # Based on the user request, Role 1 (Admin) gets everything.
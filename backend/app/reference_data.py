@@ -0,0 +1,240 @@
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from types import MappingProxyType
+from typing import FrozenSet, Mapping, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.cache_bus import LocalCache
+from app.database import SessionLocal
+from app.models.base import ActionType
+from app.models.user_models import (
+    EmailRoleMapping, Module, Permission, Role, role_permissions_table, user_roles_table
+)
+
+# in-process cache of the small, rarely written lookup tables: action types, roles, permissions,
+# modules and email->role mappings. loaded once (at startup, or on first use) into an immutable snapshot;
+# the admin writes that already call cache_bus.invalidate("roles" / "permissions" / ...) drop it in every
+# worker and the next reader reloads it. snapshot.version is a digest of the contents, so it is the same
+# in every worker for the same data and can go into etags.
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "reference_data"
+FLUSH_ON = ("roles", "permissions", "modules", "action_types", "email_role_mappings")
+
+
+@dataclass(frozen=True)
+class ActionTypeRef:
+    id: int
+    name: str
+    is_active: bool
+
+
+@dataclass(frozen=True)
+class ModuleRef:
+    id: int
+    name: str
+
+
+@dataclass(frozen=True)
+class PermissionRef:
+    id: int
+    permission_name: str
+    module_id: Optional[int]
+    module: Optional[ModuleRef]
+
+
+@dataclass(frozen=True)
+class RoleRef:
+    id: int
+    name: str
+    permission_ids: FrozenSet[int]
+
+
+@dataclass(frozen=True)
+class EmailRoleRule:
+    id: int
+    email_pattern: str
+    role_id: int
+
+
+class EmailRoleIndex:
+    # email -> role ids for the EmailRoleMapping rules. exact patterns are a dict lookup (case-sensitive, as
+    # before); "%suffix" patterns go into a trie over the reversed, lowercased suffix, so resolving an email
+    # walks its characters from the end once, however many agency domain rules are loaded.
+    def __init__(self, rules: Tuple[EmailRoleRule, ...]):
+        exact = {}
+        self._trie = {}
+        for rule in rules:
+            pattern = rule.email_pattern
+            if pattern.startswith("%"):
+                node = self._trie
+                for char in reversed(pattern[1:].lower()):
+                    node = node.setdefault(char, {})
+                node.setdefault(None, []).append(rule.role_id)  # None marks the end of a suffix
+            else:
+                exact.setdefault(pattern, []).append(rule.role_id)
+        self._exact = {pattern: tuple(role_ids) for pattern, role_ids in exact.items()}
+
+    def exact(self, email: str) -> Tuple[int, ...]:
+        return self._exact.get(email, ())
+
+    def resolve(self, email: str) -> Tuple[int, ...]:
+        role_ids = list(self._exact.get(email, ()))
+        node = self._trie
+        role_ids.extend(node.get(None, ()))  # a bare "%" matches everything
+        for char in reversed(email.lower()):
+            node = node.get(char)
+            if node is None:
+                break
+            role_ids.extend(node.get(None, ()))
+        return tuple(dict.fromkeys(role_ids))
+
+
+@dataclass(frozen=True)
+class ReferenceData:
+    version: str
+    loaded_at: datetime
+    action_types_by_name: Mapping[str, ActionTypeRef]
+    modules_by_id: Mapping[int, ModuleRef]
+    permissions_by_id: Mapping[int, PermissionRef]
+    roles_by_id: Mapping[int, RoleRef]
+    roles_by_name: Mapping[str, RoleRef]
+    email_role_rules: Tuple[EmailRoleRule, ...]
+    email_roles: EmailRoleIndex
+
+
+@dataclass(frozen=True)
+class PermissionMatrix:
+    # what a given set of roles can do, grouped by module for the profile endpoint
+    version: str
+    roles: Tuple[RoleRef, ...]
+    modules: Tuple[Tuple[str, Tuple[str, ...]], ...]  # (module name, permission names)
+    permission_names: FrozenSet[str]
+
+
+def compile_permission_matrix(ref: ReferenceData, role_ids: FrozenSet[int]) -> PermissionMatrix:
+    roles = tuple(sorted((ref.roles_by_id[r] for r in role_ids if r in ref.roles_by_id), key=lambda r: r.id))
+    by_module = {}
+    for role in roles:
+        for permission_id in role.permission_ids:
+            permission = ref.permissions_by_id.get(permission_id)
+            if permission is None:
+                continue
+            module_name = permission.module.name if permission.module else "Other"
+            by_module.setdefault(module_name, set()).add(permission.permission_name)
+    modules = tuple((module, tuple(sorted(names))) for module, names in sorted(by_module.items()))
+    return PermissionMatrix(
+        version=hashlib.sha1(repr((ref.version, sorted(role_ids))).encode()).hexdigest()[:16],
+        roles=roles,
+        modules=modules,
+        permission_names=frozenset(name for _, names in modules for name in names),
+    )
+
+
+def load_reference_data(db: Session) -> ReferenceData:
+    modules = {
+        row.id: ModuleRef(row.id, row.name)
+        for row in db.execute(select(Module.id, Module.name))
+    }
+    permissions = {
+        row.id: PermissionRef(row.id, row.permission_name, row.module_id, modules.get(row.module_id))
+        for row in db.execute(select(Permission.id, Permission.permission_name, Permission.module_id))
+    }
+    role_permissions = {}
+    for row in db.execute(select(role_permissions_table.c.role_id, role_permissions_table.c.permission_id)):
+        role_permissions.setdefault(row.role_id, set()).add(row.permission_id)
+    roles = {
+        row.id: RoleRef(row.id, row.name, frozenset(role_permissions.get(row.id, ())))
+        for row in db.execute(select(Role.id, Role.name))
+    }
+    action_types = {
+        row.name: ActionTypeRef(row.id, row.name, bool(row.is_active))
+        for row in db.execute(select(ActionType.id, ActionType.name, ActionType.is_active))
+    }
+    rules = tuple(
+        EmailRoleRule(row.id, row.email_pattern, row.role_id)
+        for row in db.execute(
+            select(EmailRoleMapping.id, EmailRoleMapping.email_pattern, EmailRoleMapping.role_id).order_by(EmailRoleMapping.id)
+        )
+    )
+
+    digest = hashlib.sha1(repr((
+        sorted(modules.items()), sorted(permissions.items()),
+        sorted((role.id, role.name, sorted(role.permission_ids)) for role in roles.values()),
+        sorted(action_types.items()), rules,
+    )).encode()).hexdigest()[:16]
+
+    return ReferenceData(
+        version=digest,
+        loaded_at=datetime.now(timezone.utc),
+        action_types_by_name=MappingProxyType(action_types),
+        modules_by_id=MappingProxyType(modules),
+        permissions_by_id=MappingProxyType(permissions),
+        roles_by_id=MappingProxyType(roles),
+        roles_by_name=MappingProxyType({role.name: role for role in roles.values()}),
+        email_role_rules=rules,
+        email_roles=EmailRoleIndex(rules),
+    )
+
+
+_cache = LocalCache(NAMESPACE, also_flush_on=FLUSH_ON)
+# user id -> role ids, evicted by invalidate(db, "user_roles", [user.id]) on assignment
+_user_roles = LocalCache("user_roles")
+_load_lock = threading.Lock()
+
+
+def get_reference_data(db: Optional[Session] = None) -> ReferenceData:
+    snapshot = _cache.get("snapshot")
+    if snapshot is not None:
+        return snapshot
+    with _load_lock:
+        snapshot = _cache.get("snapshot")
+        if snapshot is not None:
+            return snapshot
+        # an rbac commit landing while we load bumps the generation, then this snapshot is used once, not cached
+        generation = _cache.generation
+        if db is not None:
+            snapshot = load_reference_data(db)
+        else:
+            with SessionLocal() as own:
+                snapshot = load_reference_data(own)
+        _cache.set("snapshot", snapshot, generation=generation)
+        return snapshot
+
+
+def get_permission_matrix(role_ids, db: Optional[Session] = None) -> PermissionMatrix:
+    # compiled once per distinct set of role ids, dropped with the snapshot on any rbac write
+    generation = _cache.generation
+    ref = get_reference_data(db)
+    role_ids = frozenset(role_ids)
+    key = ("matrix", ref.version, role_ids)
+    matrix = _cache.get(key)
+    if matrix is None:
+        matrix = compile_permission_matrix(ref, role_ids)
+        _cache.set(key, matrix, generation=generation)
+    return matrix
+
+
+def get_user_role_ids(db: Session, user) -> FrozenSet[int]:
+    role_ids = _user_roles.get(user.id)
+    if role_ids is None:
+        generation = _user_roles.generation
+        role_ids = frozenset(db.scalars(
+            select(user_roles_table.c.role_id).where(user_roles_table.c.user_email == user.email)
+        ))
+        _user_roles.set(user.id, role_ids, generation=generation)
+    return role_ids
+
+
+def warm():
+    try:
+        get_reference_data()
+    except Exception:
+        # tables may not exist yet (fresh db before migrations), the first request loads it instead
+        logger.warning("could not preload reference data", exc_info=True)
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Generic, TypeVar, Optional
+from pydantic import BaseModel, Field
+from typing import Generic, List, TypeVar, Optional
+from app.config import settings
 
 DataType = TypeVar('DataType')
 
@@ -8,3 +9,23 @@ class ApiResponse(BaseModel, Generic[DataType]):
     message: Optional[str] = None
     data: Optional[DataType] = None
     timestamp: Optional[str] = None  # optional, add if needed
+
+# list responses, total is only filled when the caller asks for it with count=
+class PaginatedResponse(ApiResponse[DataType], Generic[DataType]):
+    total: Optional[int] = None
+    total_estimated: bool = False
+
+# keyset paginated lists, pass next_cursor back as cursor= for the following page
+class CursorPaginatedResponse(ApiResponse[DataType], Generic[DataType]):
+    next_cursor: Optional[str] = None
+
+# request body for the batch-get endpoints
+class BatchGetRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=settings.BATCH_GET_MAX_IDS)
+    include: List[str] = []  # relations to load alongside each record
+
+# one entry per requested id, in request order
+class BatchGetItem(BaseModel, Generic[DataType]):
+    id: int
+    found: bool
+    data: Optional[DataType] = None
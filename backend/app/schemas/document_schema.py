@@ -1,6 +1,6 @@
 from datetime import datetime
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
 
 class DocumentUploadResponse(BaseModel):
     id: int
@@ -10,6 +10,13 @@ class DocumentUploadResponse(BaseModel):
     status: str
     created_by: Optional[int]
 
+class DocumentBatchUploadItem(BaseModel):
+    filename: str
+    status: str  # uploaded / failed
+    document_id: Optional[int] = None
+    document_url: Optional[str] = None
+    error: Optional[str] = None
+
 class DocumentLibrarySchema(BaseModel):
     id: int
     document_name: str
@@ -26,6 +33,41 @@ class DocumentLibrarySchema(BaseModel):
         orm_mode = True
 
 
+# small document row embedded in master details
+class DocumentSummary(BaseModel):
+    id: int
+    document_name: str
+    document_type: Optional[str] = None
+    document_url: Optional[str] = None
+    status: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+# list row, no ocr payload
+class DocumentListItem(BaseModel):
+    id: int
+    document_name: str
+    document_type: Optional[str] = None
+    document_size: Optional[float] = None
+    document_url: Optional[str] = None
+    status: Optional[str] = None
+    content_type: Optional[str] = None
+    created_at: Optional[datetime] = None
+    created_by: Optional[int] = None
+    master_record_id: Optional[int] = None
+    is_archived: Optional[bool] = None
+
+    class Config:
+        from_attributes = True
+
+class DocumentSearchHit(DocumentListItem):
+    rank: float
+    highlight: Optional[str] = None  # matching fragment, terms wrapped in <mark></mark>
+
+
 class DocumentResponse(BaseModel):
     id: int
     document_name: str
@@ -53,3 +95,26 @@ class DocumentUpdateRequest(BaseModel):
     class Config:
         orm_mode = True
 
+
+class DocumentRecordLinkOut(BaseModel):
+    id: int
+    document_id: int
+    record_type: str
+    record_id: int
+    confidence: float
+    matched_on: Optional[str] = None
+    status: str
+    created_at: Optional[datetime] = None
+    reviewed_by: Optional[int] = None
+    reviewed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class DocumentLinkReviewRequest(BaseModel):
+    status: Literal["accepted", "rejected"]
+
+class AutoLinkRunResponse(BaseModel):
+    batches: int
+    documents_processed: int
+    links_proposed: int
@@ -156,9 +156,9 @@ class DriverLicenseOriginalDetailResponse(DriverLicenseOriginalBase):
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
     
-    # Relationships
-    contacts: List[DriverLicenseContactResponse] = []
-    fictitious_traps: List[DriverLicenseFictitiousTrapResponse] = []
+    # Relationships, None when not requested on a batch lookup
+    contacts: Optional[List[DriverLicenseContactResponse]] = []
+    fictitious_traps: Optional[List[DriverLicenseFictitiousTrapResponse]] = []
     
     model_config = ConfigDict(from_attributes=True)
 
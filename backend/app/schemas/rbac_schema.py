@@ -1,5 +1,7 @@
+from datetime import datetime
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from app.config import settings
 
 class ModuleBase(BaseModel):
     name: str
@@ -48,3 +50,26 @@ class Role(RoleBase):
 class UserRoleAssignmentByEmail(BaseModel):
     email: str
     role_ids: List[int]
+
+# many (email, role_ids) pairs in one call, each replaces that email's roles like the single endpoint
+class BulkRoleAssignment(BaseModel):
+    assignments: List[UserRoleAssignmentByEmail] = Field(..., min_length=1, max_length=settings.BULK_ROLE_ASSIGNMENT_MAX)
+
+class BulkRoleAssignmentResult(BaseModel):
+    users_updated: int  # existing users, user_roles replaced
+    emails_pre_assigned: int  # no user yet, email_role_mappings replaced
+
+class AdminUserRole(BaseModel):
+    id: int
+    name: str
+
+# row of GET /admin/users
+class AdminUser(BaseModel):
+    id: int
+    email: str
+    first_name: Optional[str] = None
+    middle_name: Optional[str] = None
+    last_name: Optional[str] = None
+    is_active: bool
+    created_at: Optional[datetime] = None
+    roles: List[AdminUserRole] = []
@@ -4,6 +4,8 @@ from datetime import datetime, date
 from typing import Optional, List
 from pydantic import Field, field_validator
 from sqlalchemy import func
+from app.schemas.action_schema import ActionLogOut
+from app.schemas.document_schema import DocumentSummary
 
 class Config:
     from_attributes = True #tells orm can access attributes
@@ -80,8 +82,8 @@ class VehicleRegistrationUnderCover(BaseModel):
     registered_owner: Optional[str] = None
     status: Optional[str] = None
     
-    #trap_info will be a LIST of the schema i defined above
-    trap_info: List[VehicleRegistrationUnderCoverTrapInfo] = []
+    #trap_info will be a LIST of the schema i defined above, None when it was not requested
+    trap_info: Optional[List[VehicleRegistrationUnderCoverTrapInfo]] = []
     
     class Config:
         from_attributes = True
@@ -93,7 +95,7 @@ class VehicleRegistrationFictitious(BaseModel):
     registered_owner: Optional[str] = None
     status: Optional[str] = None
     
-    trap_info: List[VehicleRegistrationFictitiousTrapInfo] = []
+    trap_info: Optional[List[VehicleRegistrationFictitiousTrapInfo]] = []
     
     class Config:
         from_attributes = True
@@ -178,12 +180,15 @@ class VehicleRegistrationMaster(VehicleRegistrationMasterBase):
 
 # DETAILS schema -it inherits everything from VehicleRegistrationMaster and then adds all the nested lists
 class VehicleRegistrationMasterDetails(VehicleRegistrationMaster):
-    # These will be lists of the schemas we defined at the top
-    contacts: List[VehicleRegistrationContact] = []
-    reciprocal_issued: List[VehicleRegistrationReciprocalIssued] = []
-    reciprocal_received: List[VehicleRegistrationReciprocalReceived] = []
-    undercover_records: List[VehicleRegistrationUnderCover] = []
-    fictitious_records: List[VehicleRegistrationFictitious] = []
+    # These will be lists of the schemas we defined at the top, None means the relation was not loaded
+    contacts: Optional[List[VehicleRegistrationContact]] = []
+    reciprocal_issued: Optional[List[VehicleRegistrationReciprocalIssued]] = []
+    reciprocal_received: Optional[List[VehicleRegistrationReciprocalReceived]] = []
+    undercover_records: Optional[List[VehicleRegistrationUnderCover]] = []
+    fictitious_records: Optional[List[VehicleRegistrationFictitious]] = []
+    # only filled in when asked for with include=
+    documents: Optional[List[DocumentSummary]] = None
+    history: Optional[List[ActionLogOut]] = None
     
     class Config:
         from_attributes = True
@@ -417,3 +422,54 @@ class VehicleRegistrationFictitiousResponse(VehicleRegistrationResponse):
     class Config:
         from_attributes = True
 
+
+# list rows: the detail responses without the deferred large-text columns (address, description,
+# error_text), which the list query no longer loads. ask for them explicitly with fields= if needed
+class VehicleRegistrationListItem(BaseModel):
+    id: int
+    license_number: str
+    vehicle_id_number: str
+    active_status: Optional[bool] = None
+    registered_owner: str
+    city: Optional[str] = None
+    state: Optional[str] = None
+    zip_code: Optional[str] = None
+    make: Optional[str] = None
+    year_model: Optional[int] = None
+    class_type: Optional[str] = None
+    type_license: Optional[str] = None
+    type_vehicle: Optional[str] = None
+    model: Optional[str] = None
+    body_type: Optional[str] = None
+    category: Optional[str] = None
+
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    date_recieved: Optional[date] = None
+    date_issued: Optional[date] = None
+    expiration_date: Optional[date] = None
+    date_fee_recieved: Optional[date] = None
+    amount_paid: Optional[Decimal] = None
+    amount_due: Optional[Decimal] = None
+    amount_recieved: Optional[Decimal] = None
+    use_tax: Optional[int] = None
+    sticker_issued: Optional[str] = None
+    sticker_numbers: Optional[str] = None
+    created_by: Optional[str] = None
+    updated_by: Optional[str] = None
+    parent: str = Field(default="Vehicle Registration")
+    class Config:
+        from_attributes = True
+        populate_by_name = True
+
+class VehicleRegistrationMasterListItem(VehicleRegistrationListItem):
+    approval_status: Optional[str] = None
+    list: str = Field(default="Master Record")
+
+class VehicleRegistrationUnderCoverListItem(VehicleRegistrationListItem):
+    list: str = Field(default="Undercover Record")
+    master_record_id : Optional[int] = None
+
+class VehicleRegistrationFictitiousListItem(VehicleRegistrationListItem):
+    list: str = Field(default="Fictitious Record")
+    master_record_id : Optional[int] = None
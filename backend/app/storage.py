@@ -0,0 +1,326 @@
+import gzip
+import hashlib
+import os
+import shutil
+import unicodedata
+import zlib
+from typing import BinaryIO, Iterator, Optional, Tuple
+from urllib.parse import quote
+
+from app.config import settings
+
+# where document files live. DocumentLibrary.document_url says which backend holds a file:
+#   /static/uploads/<key>   local disk (LOCAL_STORAGE_DIR, served by the /static mount)
+#   s3://<bucket>/<key>     s3 or any s3-compatible store (minio in dev, S3_ENDPOINT_URL)
+#   cold://<key>            cold tier on local disk (COLD_STORAGE_DIR), not served by /static
+#   s3://<cold bucket>/<key> cold tier in S3_COLD_BUCKET
+# new uploads go to STORAGE_BACKEND; reads follow the url so both can be live during a migration
+# (python -m app.utils.migrate_storage). cold files are compressed (DocumentLibrary.compression),
+# open_document undoes that while streaming.
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def content_disposition(filename: str) -> str:
+    # headers must be latin-1: an ascii filename= for old clients plus the real name as rfc 5987 filename*=
+    fallback = unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode()
+    fallback = "".join(c for c in fallback if c.isprintable() and c not in '"\\').strip()
+    if not fallback or fallback.startswith("."):
+        fallback = "download" + fallback  # nothing ascii left of the name, keep the extension
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+class LocalStorage:
+    name = "local"
+
+    def __init__(self, root: str, url_prefix: str = "/static/uploads/"):
+        self.root = root
+        self.url_prefix = url_prefix
+
+    def _path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def url_for(self, key: str) -> str:
+        return f"{self.url_prefix}{key}"
+
+    def key_from_url(self, url: str) -> Optional[str]:
+        return url[len(self.url_prefix):] if url and url.startswith(self.url_prefix) else None
+
+    def save(self, key: str, source: BinaryIO) -> int:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            with open(path, "wb") as target:
+                shutil.copyfileobj(source, target, length=CHUNK_SIZE)
+        except Exception:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        return os.path.getsize(path)
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self._path(key), "rb")
+
+    def delete(self, key: str):
+        path = self._path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def size(self, key: str) -> Optional[int]:
+        path = self._path(key)
+        return os.path.getsize(path) if os.path.exists(path) else None
+
+    def iter_keys(self, _prefix: str = "") -> Iterator[str]:
+        # in key order like an s3 listing, so a walk can be resumed after the last key seen
+        directory = os.path.join(self.root, _prefix)
+        if not os.path.isdir(directory):
+            return
+        entries = sorted(os.scandir(directory), key=lambda e: e.name + "/" if e.is_dir() else e.name)
+        for entry in entries:
+            if entry.is_dir():
+                yield from self.iter_keys(f"{_prefix}{entry.name}/")
+            else:
+                yield f"{_prefix}{entry.name}"
+
+    def presigned_url(self, key: str, filename: Optional[str] = None) -> Optional[str]:
+        return None  # served by the api
+
+
+class S3Storage:
+    name = "s3"
+
+    def __init__(self, bucket: str, prefix: str = ""):
+        self.bucket = bucket
+        self.prefix = prefix
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            try:
+                import boto3
+                from botocore.config import Config
+            except ImportError:
+                raise RuntimeError("STORAGE_BACKEND=s3 needs boto3 installed")
+            self._client = boto3.client(
+                "s3",
+                endpoint_url=settings.S3_ENDPOINT_URL or None,
+                region_name=settings.S3_REGION,
+                aws_access_key_id=settings.S3_ACCESS_KEY_ID or None,
+                aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY or None,
+                # minio and most s3-compatible stores want path style addressing
+                config=Config(s3={"addressing_style": "path"} if settings.S3_ENDPOINT_URL else {}),
+            )
+        return self._client
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def url_for(self, key: str) -> str:
+        return f"s3://{self.bucket}/{self._object_key(key)}"
+
+    def key_from_url(self, url: str) -> Optional[str]:
+        head = f"s3://{self.bucket}/{self.prefix}"
+        return url[len(head):] if url and url.startswith(head) else None
+
+    def save(self, key: str, source: BinaryIO) -> int:
+        from boto3.s3.transfer import TransferConfig
+
+        # upload_fileobj streams the source in parts, anything over the threshold is a multipart upload
+        chunk = settings.S3_MULTIPART_CHUNK_MB * 1024 * 1024
+        reader = HashingReader(source)
+        self.client.upload_fileobj(
+            reader, self.bucket, self._object_key(key),
+            Config=TransferConfig(multipart_threshold=chunk, multipart_chunksize=chunk)
+        )
+        return reader.count
+
+    def open(self, key: str) -> BinaryIO:
+        return self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))["Body"]
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def size(self, key: str) -> Optional[int]:
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))["ContentLength"]
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def iter_keys(self) -> Iterator[str]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for item in page.get("Contents", []):
+                yield item["Key"][len(self.prefix):]
+
+    def presigned_url(self, key: str, filename: Optional[str] = None) -> Optional[str]:
+        params = {"Bucket": self.bucket, "Key": self._object_key(key)}
+        if filename:
+            params["ResponseContentDisposition"] = content_disposition(filename)
+        return self.client.generate_presigned_url(
+            "get_object", Params=params, ExpiresIn=settings.PRESIGNED_URL_SECONDS
+        )
+
+
+class HashingReader:
+    # wraps a stream being saved, counts and sha256-hashes what passes through
+    def __init__(self, source: BinaryIO):
+        self.source = source
+        self.count = 0
+        self._sha256 = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.source.read(size)
+        self.count += len(data)
+        self._sha256.update(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self._sha256.hexdigest()
+
+
+_backends = {}
+
+
+def get_backend(name: str):
+    if name not in _backends:
+        if name == "local":
+            _backends[name] = LocalStorage(settings.LOCAL_STORAGE_DIR)
+        elif name == "s3":
+            if not settings.S3_BUCKET:
+                raise RuntimeError("S3_BUCKET is not set")
+            _backends[name] = S3Storage(settings.S3_BUCKET, settings.S3_PREFIX)
+        elif name == "cold-local":
+            backend = LocalStorage(settings.COLD_STORAGE_DIR, url_prefix="cold://")
+            backend.name = name
+            _backends[name] = backend
+        elif name == "cold-s3":
+            if not settings.S3_COLD_BUCKET:
+                raise RuntimeError("S3_COLD_BUCKET is not set")
+            backend = S3Storage(settings.S3_COLD_BUCKET, settings.S3_PREFIX)
+            backend.name = name
+            _backends[name] = backend
+        else:
+            raise RuntimeError(f"Unknown storage backend: {name}")
+    return _backends[name]
+
+
+def get_storage():
+    # backend for new files
+    return get_backend(settings.STORAGE_BACKEND)
+
+
+def _backend_name_for(document_url: str) -> str:
+    if document_url.startswith("cold://"):
+        return "cold-local"
+    if document_url.startswith("s3://"):
+        if settings.S3_COLD_BUCKET and document_url.startswith(f"s3://{settings.S3_COLD_BUCKET}/"):
+            return "cold-s3"
+        return "s3"
+    return "local"
+
+
+def resolve(document_url: str) -> Tuple[object, str]:
+    # (backend, key) for a stored document_url
+    backend = get_backend(_backend_name_for(document_url or ""))
+    key = backend.key_from_url(document_url)
+    if key is None:
+        raise ValueError(f"Unrecognised document url: {document_url}")
+    return backend, key
+
+
+class _GzipReader:
+    # gzip-compresses a stream as it is read, so it can be handed to save()
+    def __init__(self, source: BinaryIO, level: int):
+        self.source = source
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        self.buffer = b""
+        self.done = False
+
+    def read(self, size: int = -1) -> bytes:
+        while not self.done and (size < 0 or len(self.buffer) < size):
+            chunk = self.source.read(CHUNK_SIZE)
+            if chunk:
+                self.buffer += self.compressor.compress(chunk)
+            else:
+                self.buffer += self.compressor.flush()
+                self.done = True
+        if size < 0:
+            data, self.buffer = self.buffer, b""
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def close(self):
+        self.source.close()
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd compression needs the zstandard package installed")
+    return zstandard
+
+
+def usable_codec(codec: str) -> str:
+    # zstd without the zstandard package falls back to gzip, which is always there
+    if codec == "zstd":
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            return "gzip"
+    return codec
+
+
+def compressing_reader(source: BinaryIO, codec: str) -> BinaryIO:
+    if codec == "zstd":
+        return _zstandard().ZstdCompressor(level=settings.TIERING_ZSTD_LEVEL).stream_reader(source)
+    if codec == "gzip":
+        return _GzipReader(source, level=9)
+    raise RuntimeError(f"Unknown compression: {codec}")
+
+
+def open_document(document_url: str, compression: Optional[str] = None) -> BinaryIO:
+    # the original bytes of a stored document, decompressed on the fly for cold files
+    backend, key = resolve(document_url)
+    source = backend.open(key)
+    if not compression:
+        return source
+    if compression == "zstd":
+        return _zstandard().ZstdDecompressor().stream_reader(source, closefd=True)
+    if compression == "gzip":
+        return _ClosingGzipFile(source)
+    source.close()
+    raise RuntimeError(f"Unknown compression: {compression}")
+
+
+class _ClosingGzipFile(gzip.GzipFile):
+    # GzipFile leaves the underlying stream open
+    def __init__(self, source: BinaryIO):
+        super().__init__(fileobj=source, mode="rb")
+        self._source = source
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._source.close()
+
+
+def iter_chunks(source: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    try:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        source.close()
@@ -0,0 +1,89 @@
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, List, Optional
+from uuid import uuid4
+
+from fastapi import HTTPException, UploadFile
+
+from app.config import settings
+from app.storage import HashingReader
+
+# batch upload helpers: turn the uploaded files (or one zip) into entries and write them to storage in parallel.
+# uploads arrive as spooled temp files, zip members are decompressed straight from that file to the target,
+# so neither the archive nor its members are held in memory.
+
+
+@dataclass
+class BatchEntry:
+    filename: str
+    open: Optional[Callable[[], BinaryIO]] = None
+    stored_name: Optional[str] = None
+    size_kb: Optional[float] = None
+    content_hash: Optional[str] = None
+    error: Optional[str] = None
+
+
+def _is_zip(upload: UploadFile) -> bool:
+    name = (upload.filename or "").lower()
+    return name.endswith(".zip") or upload.content_type in ("application/zip", "application/x-zip-compressed")
+
+
+def _safe_name(name: str) -> str:
+    # no directories from the archive, no path traversal
+    return os.path.basename(name.replace("\\", "/")).strip()
+
+
+def collect_entries(files: List[UploadFile]) -> List[BatchEntry]:
+    if len(files) == 1 and _is_zip(files[0]):
+        try:
+            archive = zipfile.ZipFile(files[0].file)
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=400, detail="Uploaded archive is not a valid zip file")
+
+        members = [
+            m for m in archive.infolist()
+            if not m.is_dir() and not m.filename.startswith("__MACOSX/") and not _safe_name(m.filename).startswith(".")
+        ]
+        if len(members) > settings.BATCH_UPLOAD_MAX_FILES:
+            raise HTTPException(status_code=400, detail=f"Archive has more than {settings.BATCH_UPLOAD_MAX_FILES} files")
+        # declared sizes only, but enough to turn away an obvious zip bomb before extracting anything
+        if sum(m.file_size for m in members) > settings.BATCH_UPLOAD_MAX_BYTES:
+            raise HTTPException(status_code=400, detail="Archive is too large once extracted")
+
+        return [BatchEntry(filename=_safe_name(m.filename), open=lambda m=m: archive.open(m)) for m in members]
+
+    if len(files) > settings.BATCH_UPLOAD_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BATCH_UPLOAD_MAX_FILES} files per batch")
+    return [
+        BatchEntry(filename=_safe_name(f.filename or "unnamed"), open=lambda f=f: f.file)
+        for f in files
+    ]
+
+
+def _write_entry(entry: BatchEntry, storage):
+    if not entry.filename:
+        entry.error = "Missing file name"
+        return
+    stored_name = f"{uuid4().hex}_{entry.filename}"
+    try:
+        with entry.open() as source:
+            reader = HashingReader(source)
+            size = storage.save(stored_name, reader)
+        entry.stored_name = stored_name
+        entry.size_kb = round(size / 1024, 2)
+        entry.content_hash = reader.hexdigest()
+    except Exception as e:
+        entry.error = str(e)
+
+
+def write_entries(entries: List[BatchEntry], storage):
+    with ThreadPoolExecutor(max_workers=settings.BATCH_UPLOAD_WORKERS) as pool:
+        list(pool.map(lambda entry: _write_entry(entry, storage), entries))
+
+
+def remove_written(entries: List[BatchEntry], storage):
+    for entry in entries:
+        if entry.stored_name:
+            storage.delete(entry.stored_name)
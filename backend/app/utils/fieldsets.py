@@ -0,0 +1,47 @@
+from typing import Any, Dict, Iterable, List, Optional
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import load_only
+
+# sparse fieldsets for listing endpoints (fields=id,license_number,...)
+
+def allowed_fields(schema, model) -> List[str]:
+    # only fields that exist on both the response schema and the table can be projected
+    columns = model.__table__.columns.keys()
+    return [name for name in schema.model_fields if name in columns]
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str], key: str = "id") -> Optional[List[str]]:
+    # None means "no fields= given", callers return the full schema in that case
+    if not fields:
+        return None
+
+    allowed = list(allowed)
+    requested = []
+    for name in fields.split(","):
+        name = name.strip()
+        if name and name not in requested:
+            requested.append(name)
+
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(allowed)}"
+        )
+
+    # rows are always identified by their key
+    if key not in requested:
+        requested.insert(0, key)
+    return requested
+
+def load_only_option(model, fields: List[str]):
+    # raiseload so a field we forgot to project fails loudly instead of lazy loading per row
+    return load_only(*[getattr(model, name) for name in fields], raiseload=True)
+
+def project(row, fields: List[str]) -> Dict[str, Any]:
+    return {name: getattr(row, name) for name in fields}
+
+def sparse_response(content) -> JSONResponse:
+    # bypasses response_model validation, which would fill the left out fields back in with nulls
+    return JSONResponse(content=jsonable_encoder(content))
@@ -0,0 +1,81 @@
+import argparse
+from contextlib import closing
+from typing import Optional
+
+from sqlalchemy.orm import load_only
+
+from app.database import SessionLocal
+from app.models.document_library import DocumentLibrary
+from app.storage import get_backend, resolve
+
+# copies document files from one storage backend to another and repoints document_url.
+#   python -m app.utils.migrate_storage --to s3 [--batch-size 200] [--delete-source] [--dry-run]
+# walks the library by id in batches and commits per batch, so it can be stopped and rerun;
+# documents already on the target backend are skipped, and so are cold-tier ones (app.utils.tier_documents).
+
+
+def migrate(target_name: str, batch_size: int = 200, delete_source: bool = False, dry_run: bool = False,
+            start_after: Optional[int] = None):
+    target = get_backend(target_name)
+    db = SessionLocal()
+    moved = skipped = failed = 0
+    last_id = start_after or 0
+    try:
+        while True:
+            docs = db.query(DocumentLibrary).options(
+                load_only(DocumentLibrary.id, DocumentLibrary.document_url)
+            ).filter(
+                DocumentLibrary.id > last_id,
+                DocumentLibrary.storage_tier == "hot"
+            ).order_by(DocumentLibrary.id).limit(batch_size).all()
+            if not docs:
+                break
+            last_id = docs[-1].id
+
+            sources_to_delete = []
+            for doc in docs:
+                try:
+                    source, key = resolve(doc.document_url)
+                except ValueError:
+                    print(f"  ! document {doc.id}: unrecognised url {doc.document_url}")
+                    failed += 1
+                    continue
+                if source.name == target.name:
+                    skipped += 1
+                    continue
+                if dry_run:
+                    print(f"  would move document {doc.id}: {doc.document_url} -> {target.url_for(key)}")
+                    moved += 1
+                    continue
+                try:
+                    with closing(source.open(key)) as stream:
+                        target.save(key, stream)
+                except Exception as e:
+                    print(f"  ! document {doc.id}: {e}")
+                    failed += 1
+                    continue
+                doc.document_url = target.url_for(key)
+                sources_to_delete.append((source, key))
+                moved += 1
+
+            if not dry_run:
+                db.commit()
+                # only once the new urls are committed
+                if delete_source:
+                    for source, key in sources_to_delete:
+                        source.delete(key)
+            print(f"up to document {last_id}: moved {moved}, skipped {skipped}, failed {failed}")
+    finally:
+        db.close()
+    return {"moved": moved, "skipped": skipped, "failed": failed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move document files to another storage backend")
+    parser.add_argument("--to", dest="target", choices=["local", "s3"], required=True)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--delete-source", action="store_true", help="remove the old copy after the url is updated")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--start-after", type=int, default=None, help="resume after this document id")
+    args = parser.parse_args()
+    migrate(args.target, args.batch_size, args.delete_source, args.dry_run, args.start_after)
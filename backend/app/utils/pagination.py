@@ -0,0 +1,71 @@
+from typing import List, Literal, NamedTuple, Optional
+
+from fastapi import Response
+from sqlalchemy import func, text
+from sqlalchemy.orm import Query
+
+# none: no total, exact: COUNT(*) OVER() on the page query, estimated: planner estimate
+TotalMode = Literal["none", "exact", "estimated"]
+
+
+class Page(NamedTuple):
+    items: List
+    total: Optional[int] = None
+    estimated: bool = False
+
+
+def paginate(query: Query, skip: int, limit: int, mode: TotalMode = "none") -> Page:
+    if mode == "exact":
+        # the window count rides along with the page rows, no second scan
+        rows = query.add_columns(func.count().over().label("total_count")).offset(skip).limit(limit).all()
+        items = [row[0] for row in rows]
+        if rows:
+            return Page(items, rows[0][1])
+        if skip == 0:
+            return Page(items, 0)
+        # page past the end, there is no row to read the window count from
+        return Page(items, query.order_by(None).count())
+
+    items = query.offset(skip).limit(limit).all()
+    if mode == "none":
+        return Page(items)
+
+    # a short page already tells us the total
+    if len(items) < limit and (items or skip == 0):
+        return Page(items, skip + len(items))
+
+    estimate = estimate_count(query)
+    if estimate is None:
+        # no planner stats to lean on (sqlite dev db), just count
+        return Page(items, query.order_by(None).count())
+    return Page(items, max(estimate, skip + len(items)), estimated=True)
+
+
+def estimate_count(query: Query) -> Optional[int]:
+    conn = query.session.connection()
+    if conn.dialect.name != "postgresql":
+        return None
+
+    stmt = query.order_by(None).statement
+
+    # unfiltered listing, the table stats are good enough
+    if stmt.whereclause is None:
+        table = query.column_descriptions[0]["entity"].__table__
+        reltuples = conn.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:name AS regclass)"),
+            {"name": table.name}
+        ).scalar()
+        # -1 means the table was never analyzed
+        if reltuples is not None and reltuples >= 0:
+            return int(reltuples)
+
+    compiled = stmt.compile(dialect=conn.dialect)
+    plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", compiled.params).scalar()
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def set_total_headers(response: Response, page: Page):
+    if page.total is None:
+        return
+    response.headers["X-Total-Count"] = str(page.total)
+    response.headers["X-Total-Count-Estimated"] = "true" if page.estimated else "false"
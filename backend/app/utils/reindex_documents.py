@@ -0,0 +1,52 @@
+import argparse
+from typing import Optional
+
+from sqlalchemy import text
+
+from app.crud.document_search_crud import _is_postgres, refresh_document_search
+from app.database import SessionLocal
+from app.models.document_library import DocumentLibrary
+
+# builds the full-text search index (search_vector on postgres, document_library_fts on sqlite) for
+# documents that don't have one yet, e.g. everything uploaded before search existed.
+#   python -m app.utils.reindex_documents [--all] [--batch-size 500] [--start-after 0]
+# --all rebuilds every document instead. walks the library by id and commits per batch,
+# so it can be stopped and rerun.
+
+
+def reindex(rebuild_all: bool = False, batch_size: int = 500, start_after: Optional[int] = None):
+    db = SessionLocal()
+    indexed = 0
+    last_id = start_after or 0
+    try:
+        postgres = _is_postgres(db)
+        while True:
+            query = db.query(DocumentLibrary.id).filter(DocumentLibrary.id > last_id)
+            if not rebuild_all:
+                if postgres:
+                    query = query.filter(DocumentLibrary.search_vector.is_(None))
+                else:
+                    query = query.filter(text(
+                        "NOT EXISTS (SELECT 1 FROM document_library_fts f WHERE f.doc_id = document_library.id)"
+                    ))
+            ids = [doc_id for (doc_id,) in query.order_by(DocumentLibrary.id).limit(batch_size)]
+            if not ids:
+                break
+            last_id = ids[-1]
+
+            refresh_document_search(db, ids)
+            db.commit()
+            indexed += len(ids)
+            print(f"up to document {last_id}: indexed {indexed}")
+    finally:
+        db.close()
+    return {"indexed": indexed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the document full-text search index")
+    parser.add_argument("--all", action="store_true", help="rebuild every document, not only unindexed ones")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--start-after", type=int, default=None, help="document id to resume after")
+    args = parser.parse_args()
+    reindex(args.all, args.batch_size, args.start_after)
@@ -0,0 +1,216 @@
+import argparse
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, load_only
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.document_library import DocumentLibrary, DocumentScrubCheckpoint, DocumentScrubFinding
+from app.storage import CHUNK_SIZE, get_backend, open_document
+
+# integrity scrubber for stored documents.
+#   python -m app.utils.scrub_documents [--restart]
+# phase 1 walks document_library by id in SCRUB_BATCH_SIZE batches, hashes each file on a small thread pool
+# (throttled to SCRUB_MAX_MB_PER_SECOND) and records missing / unreadable / mismatched files; documents
+# without a content_hash get the hash they have now as their baseline.
+# phase 2 walks each storage backend in use and records files that no document points at.
+# progress is committed with every batch in document_scrub_checkpoint, so a stopped run picks up where it was.
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_ID = 1
+ORPHAN_BATCH_SIZE = 1000
+
+
+class RateLimiter:
+    # token bucket over bytes read, shared by the hashing threads
+    def __init__(self, bytes_per_second: float):
+        self.rate = bytes_per_second
+        self.allowance = bytes_per_second
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, amount: int):
+        if self.rate <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.allowance = min(self.rate, self.allowance + (now - self.last) * self.rate)
+            self.last = now
+            self.allowance -= amount
+            wait = -self.allowance / self.rate if self.allowance < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+def _hash_file(document_url: str, compression: Optional[str], limiter: RateLimiter):
+    # (sha256, None, None) or (None, finding kind, detail); cold files are hashed decompressed
+    digest = hashlib.sha256()
+    try:
+        with closing(open_document(document_url, compression)) as stream:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                limiter.consume(len(chunk))
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None, "missing", None
+    except (ValueError, RuntimeError) as e:
+        return None, "unreadable", str(e)
+    except Exception as e:
+        # s3 reports a missing key as a client error
+        if "NoSuchKey" in str(e) or "404" in str(e):
+            return None, "missing", None
+        return None, "unreadable", str(e)
+    return digest.hexdigest(), None, None
+
+
+def _checkpoint(db: Session, restart: bool) -> DocumentScrubCheckpoint:
+    checkpoint = db.get(DocumentScrubCheckpoint, CHECKPOINT_ID)
+    if checkpoint is None:
+        checkpoint = DocumentScrubCheckpoint(id=CHECKPOINT_ID)
+        db.add(checkpoint)
+        restart = True
+    if restart or checkpoint.phase == "done":
+        checkpoint.phase = "documents"
+        checkpoint.last_document_id = 0
+        checkpoint.orphan_backend = None
+        checkpoint.last_orphan_key = None
+        checkpoint.started_at = datetime.utcnow()
+        checkpoint.finished_at = None
+    db.commit()
+    return checkpoint
+
+
+def _scrub_documents(db: Session, checkpoint: DocumentScrubCheckpoint, pool: ThreadPoolExecutor,
+                     limiter: RateLimiter, counts: dict):
+    while True:
+        docs = db.query(DocumentLibrary).options(
+            load_only(DocumentLibrary.id, DocumentLibrary.document_url, DocumentLibrary.content_hash,
+                      DocumentLibrary.compression)
+        ).filter(DocumentLibrary.id > checkpoint.last_document_id).order_by(
+            DocumentLibrary.id
+        ).limit(settings.SCRUB_BATCH_SIZE).all()
+        if not docs:
+            return
+
+        results = list(pool.map(lambda doc: _hash_file(doc.document_url, doc.compression, limiter), docs))
+
+        now = datetime.utcnow()
+        findings = []
+        for doc, (actual, kind, detail) in zip(docs, results):
+            if actual is not None and doc.content_hash is None:
+                doc.content_hash = actual  # first time we've seen it, becomes the baseline
+                counts["baselined"] += 1
+            elif actual is not None and actual != doc.content_hash:
+                kind = "mismatch"
+            if kind:
+                findings.append({
+                    "document_id": doc.id,
+                    "document_url": doc.document_url,
+                    "kind": kind,
+                    "expected_hash": doc.content_hash,
+                    "actual_hash": actual,
+                    "detail": detail,
+                    "found_at": now,
+                })
+                counts[kind] += 1
+        if findings:
+            db.execute(insert(DocumentScrubFinding), findings)
+
+        counts["documents"] += len(docs)
+        checkpoint.last_document_id = docs[-1].id
+        checkpoint.updated_at = now
+        db.commit()
+        logger.info("scrub: up to document %s, %s", checkpoint.last_document_id, counts)
+
+
+def _backends_in_use() -> List[str]:
+    names = ["local"]
+    if settings.STORAGE_BACKEND == "s3" or settings.S3_BUCKET:
+        names.append("s3")
+    names.append("cold-local")
+    if settings.S3_COLD_BUCKET:
+        names.append("cold-s3")
+    return names
+
+
+def _check_orphans(db: Session, backend_name: str, keys: List[str], counts: dict):
+    backend = get_backend(backend_name)
+    urls = {backend.url_for(key): key for key in keys}
+    known = {
+        url for (url,) in db.query(DocumentLibrary.document_url).filter(DocumentLibrary.document_url.in_(list(urls)))
+    }
+    now = datetime.utcnow()
+    orphans = [
+        {"document_id": None, "document_url": url, "kind": "orphan", "found_at": now}
+        for url in urls if url not in known
+    ]
+    if orphans:
+        db.execute(insert(DocumentScrubFinding), orphans)
+        counts["orphan"] += len(orphans)
+
+
+def _scrub_orphans(db: Session, checkpoint: DocumentScrubCheckpoint, counts: dict):
+    names = _backends_in_use()
+    if checkpoint.orphan_backend in names:
+        names = names[names.index(checkpoint.orphan_backend):]
+    for name in names:
+        # resume after the last key of the previous run, iter_keys is in key order
+        resume_after = checkpoint.last_orphan_key if checkpoint.orphan_backend == name else None
+        checkpoint.orphan_backend = name
+        batch: List[str] = []
+        for key in get_backend(name).iter_keys():
+            if resume_after is not None and key <= resume_after:
+                continue
+            batch.append(key)
+            if len(batch) >= ORPHAN_BATCH_SIZE:
+                _check_orphans(db, name, batch, counts)
+                checkpoint.last_orphan_key = batch[-1]
+                checkpoint.updated_at = datetime.utcnow()
+                db.commit()
+                batch = []
+        if batch:
+            _check_orphans(db, name, batch, counts)
+        checkpoint.last_orphan_key = None
+        db.commit()
+
+
+def run_scrub(restart: bool = False, max_mb_per_second: Optional[float] = None) -> dict:
+    counts = {"documents": 0, "baselined": 0, "missing": 0, "mismatch": 0, "unreadable": 0, "orphan": 0}
+    rate = settings.SCRUB_MAX_MB_PER_SECOND if max_mb_per_second is None else max_mb_per_second
+    limiter = RateLimiter(rate * 1024 * 1024)
+    db = SessionLocal()
+    try:
+        checkpoint = _checkpoint(db, restart)
+        if checkpoint.phase == "documents":
+            with ThreadPoolExecutor(max_workers=settings.SCRUB_WORKERS, thread_name_prefix="scrub") as pool:
+                _scrub_documents(db, checkpoint, pool, limiter, counts)
+            checkpoint.phase = "orphans"
+            db.commit()
+        if checkpoint.phase == "orphans":
+            _scrub_orphans(db, checkpoint, counts)
+            checkpoint.phase = "done"
+            checkpoint.finished_at = datetime.utcnow()
+            db.commit()
+        return counts
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Check stored document files against the library")
+    parser.add_argument("--restart", action="store_true", help="start over instead of resuming the last run")
+    parser.add_argument("--max-mb-per-second", type=float, default=None, help="read throttle, 0 = unlimited")
+    args = parser.parse_args()
+    print(run_scrub(args.restart, args.max_mb_per_second))
@@ -0,0 +1,94 @@
+import argparse
+from contextlib import closing
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import load_only
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.document_library import DocumentLibrary
+from app.storage import compressing_reader, get_backend, resolve, usable_codec
+
+# moves documents older than TIERING_AGE_DAYS to the cold tier, compressed with TIERING_CODEC.
+#   python -m app.utils.tier_documents [--age-days 365] [--codec zstd|gzip] [--dry-run]
+# documents are taken by id in TIERING_BATCH_SIZE batches; the new url / compression / stored_size are
+# committed per batch before the hot copies are deleted, so a stopped run loses nothing and can be rerun.
+# downloads decompress on the fly (app.storage.open_document), recent files are untouched.
+
+
+def tier(age_days: Optional[int] = None, codec: Optional[str] = None, batch_size: Optional[int] = None,
+         dry_run: bool = False):
+    age_days = settings.TIERING_AGE_DAYS if age_days is None else age_days
+    codec = codec or settings.TIERING_CODEC
+    if usable_codec(codec) != codec:
+        print(f"  ! {codec} needs the zstandard package, compressing with gzip instead")
+        codec = usable_codec(codec)
+    batch_size = batch_size or settings.TIERING_BATCH_SIZE
+    target = get_backend(settings.TIERING_TARGET)
+    cutoff = datetime.utcnow() - timedelta(days=age_days)
+    suffix = ".zst" if codec == "zstd" else ".gz"
+
+    db = SessionLocal()
+    moved = failed = 0
+    original_kb = stored_kb = 0.0
+    last_id = 0
+    try:
+        while True:
+            docs = db.query(DocumentLibrary).options(load_only(
+                DocumentLibrary.id, DocumentLibrary.document_url, DocumentLibrary.document_size
+            )).filter(
+                DocumentLibrary.storage_tier == "hot",
+                DocumentLibrary.created_at < cutoff,
+                DocumentLibrary.id > last_id
+            ).order_by(DocumentLibrary.id).limit(batch_size).all()
+            if not docs:
+                break
+            last_id = docs[-1].id
+
+            hot_copies = []
+            for doc in docs:
+                try:
+                    source, key = resolve(doc.document_url)
+                except ValueError:
+                    print(f"  ! document {doc.id}: unrecognised url {doc.document_url}")
+                    failed += 1
+                    continue
+                if dry_run:
+                    print(f"  would tier document {doc.id}: {doc.document_url}")
+                    moved += 1
+                    continue
+                try:
+                    with closing(source.open(key)) as stream:
+                        size = target.save(key + suffix, compressing_reader(stream, codec))
+                except Exception as e:
+                    print(f"  ! document {doc.id}: {e}")
+                    failed += 1
+                    continue
+                doc.document_url = target.url_for(key + suffix)
+                doc.storage_tier = "cold"
+                doc.compression = codec
+                doc.stored_size = round(size / 1024, 2)
+                hot_copies.append((source, key))
+                moved += 1
+                original_kb += doc.document_size or 0
+                stored_kb += doc.stored_size
+
+            if not dry_run:
+                db.commit()
+                for source, key in hot_copies:
+                    source.delete(key)
+            print(f"up to document {last_id}: tiered {moved}, failed {failed}, {original_kb:.0f} kb -> {stored_kb:.0f} kb")
+    finally:
+        db.close()
+    return {"moved": moved, "failed": failed, "original_kb": round(original_kb, 2), "stored_kb": round(stored_kb, 2)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compress old documents and move them to the cold tier")
+    parser.add_argument("--age-days", type=int, default=None)
+    parser.add_argument("--codec", choices=["zstd", "gzip"], default=None)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    tier(args.age_days, args.codec, args.batch_size, args.dry_run)